@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+from typing import Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # optional: exact search is used instead
+    hnswlib = None
+
+
+def embeddings_fingerprint(embeddings: np.ndarray) -> str:
+    """
+    Checksum of an embedding matrix, stored next to a saved graph so a graph is only
+    reused for exactly the embeddings (rows, order and values) it was built from.
+    """
+    embeddings = np.ascontiguousarray(embeddings)
+    digest = hashlib.sha1(f"{embeddings.shape}:{embeddings.dtype}".encode("utf-8"))
+    digest.update(embeddings.data)
+    return digest.hexdigest()
+
+
+class EmbeddingANNIndex:
+    """
+    Cosine nearest-neighbour search over resume embeddings, used to shortlist
+    candidates before full scoring.
+
+    Uses an HNSW graph (hnswlib) when it is installed and the pool is large
+    enough for it to pay off; otherwise falls back to an exact matrix-vector
+    search. Row ids are the row positions in the embedding matrix.
+    """
+
+    def __init__(self, M: int = 16, ef_construction: int = 200, ef_search: int = 128, min_hnsw_size: int = 5000):
+        """
+        :param M: HNSW graph degree
+        :param ef_construction: HNSW build-time candidate list size
+        :param ef_search: HNSW query-time candidate list size (raised to k when k is larger)
+        :param min_hnsw_size: pools smaller than this are always searched exactly
+        """
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.min_hnsw_size = min_hnsw_size
+        self._hnsw = None
+        self._unit = None
+        self.size = 0
+
+    @property
+    def uses_hnsw(self) -> bool:
+        return self._hnsw is not None
+
+    def build(self, embeddings: np.ndarray):
+        self._hnsw = None
+        self._unit = None
+        self.size = 0
+        self.add(embeddings)
+
+    def add(self, embeddings: np.ndarray):
+        """
+        Append rows; their ids continue after the existing ones.
+        """
+        unit = self._unit_rows(embeddings)
+        if not len(unit):
+            return
+        ids = np.arange(self.size, self.size + len(unit))
+        self.size += len(unit)
+
+        if self._hnsw is None and hnswlib is not None and self.size >= self.min_hnsw_size:
+            # Pool outgrew exact search: move everything into a graph
+            previous = self._unit if self._unit is not None else np.zeros((0, unit.shape[1]), dtype=np.float32)
+            self._unit = None
+            self._hnsw = hnswlib.Index(space="ip", dim=unit.shape[1])
+            self._hnsw.init_index(max_elements=self.size, ef_construction=self.ef_construction, M=self.M)
+            unit, ids = np.vstack([previous, unit]), np.arange(self.size)
+
+        if self._hnsw is not None:
+            if self._hnsw.get_max_elements() < self.size:
+                self._hnsw.resize_index(max(self.size, 2 * self._hnsw.get_max_elements()))
+            self._hnsw.add_items(unit, ids)
+        else:
+            self._unit = unit if self._unit is None else np.vstack([self._unit, unit])
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: (row ids, cosine similarities) of the k nearest rows, best first
+        """
+        k = min(k, self.size)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = self._unit_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))
+
+        if self._hnsw is not None:
+            self._hnsw.set_ef(max(self.ef_search, k))
+            labels, distances = self._hnsw.knn_query(query, k=k)
+            # hnswlib's "ip" distance is 1 - inner product
+            return labels[0].astype(np.int64), 1 - distances[0]
+
+        similarities = self._unit @ query[0]
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return top, similarities[top]
+
+    # PERSISTENCE
+    def save(self, path: str, embeddings: np.ndarray):
+        """
+        Only the HNSW graph is worth saving; exact search is rebuilt from the embeddings.
+        A graph saved earlier at path is removed when there is none to save.
+        :param embeddings: the matrix the graph's row ids refer to, fingerprinted for load()
+        """
+        if self._hnsw is None:
+            self.remove_saved(path)
+            return
+        tmp_path = path + ".tmp"
+        self._hnsw.save_index(tmp_path)
+        os.replace(tmp_path, path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": embeddings_fingerprint(embeddings)}, f)
+        os.replace(tmp_path, path + ".json")
+
+    @staticmethod
+    def remove_saved(path: str):
+        for stale in (path, path + ".json"):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    def load(self, path: str, embeddings: np.ndarray) -> "EmbeddingANNIndex":
+        """
+        Restore a saved graph if it was saved for exactly these embeddings, otherwise build from them.
+        """
+        if hnswlib is not None and len(embeddings) >= self.min_hnsw_size and self.saved_for(path, embeddings):
+            hnsw = hnswlib.Index(space="ip", dim=embeddings.shape[1])
+            hnsw.load_index(path, max_elements=len(embeddings))
+            if hnsw.get_current_count() == len(embeddings):
+                self._hnsw, self._unit, self.size = hnsw, None, len(embeddings)
+                return self
+        self.build(embeddings)
+        return self
+
+    @staticmethod
+    def saved_for(path: str, embeddings: np.ndarray) -> bool:
+        if not os.path.exists(path) or not os.path.exists(path + ".json"):
+            return False
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            return json.load(f).get("fingerprint") == embeddings_fingerprint(embeddings)
+
+    @staticmethod
+    def _unit_rows(matrix) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2:
+            return np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
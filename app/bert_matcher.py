@@ -1,12 +1,92 @@
-from typing import List, Tuple
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer, util
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from app.bert_preprocess import BertPreprocessor
+from app.metrics import timed
+from app.models import model_registry, register_sentence_transformer
+from app.ranking import top_k_order
+
+# Stored (float16) resume embeddings are upcast to float32 this many rows at a time when scored
+SCORE_BLOCK_ROWS = 16_384
+
+
+class ChunkEmbeddingCache:
+    """
+    In-memory LRU cache of chunk embeddings keyed by a hash of the chunk text, so
+    boilerplate shared by many resumes (headers, templates, repeated sections) is encoded once.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(chunk: str) -> bytes:
+        return hashlib.sha1(chunk.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return embedding
+
+    def put(self, key: bytes, embedding: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
 
 class BertRanker:
-    def __init__(self, preprocessor: BertPreprocessor, model_name="multi-qa-mpnet-base-dot-v1"):
+    def __init__(self, preprocessor: BertPreprocessor, model_name="multi-qa-mpnet-base-dot-v1", batch_size: int = 32,
+                 backend: str = "torch", quantization: str = None, chunk_overlap: int = 0,
+                 chunk_cache_size: int = 10_000):
+        """
+        :param preprocessor: BertPreprocessor used for cleaning and chunking
+        :param model_name: SentenceTransformer model used for encoding (loaded on first use)
+        :param batch_size: number of chunks per forward pass in batched encoding
+        :param backend: encoder backend, "torch" or "onnx" (ONNX Runtime)
+        :param quantization: dynamic int8 quantization config for the onnx backend (e.g. "avx512_vnni")
+        :param chunk_overlap: tokens shared by consecutive chunks of a long resume
+        :param chunk_cache_size: chunk embeddings kept in memory for reuse (0 disables the cache)
+        """
         self.preprocessor = preprocessor
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        self.quantization = quantization
+        self.chunk_overlap = chunk_overlap
+        self.chunk_cache = ChunkEmbeddingCache(chunk_cache_size)
+        self.model_key = register_sentence_transformer(model_name, backend=backend, quantization=quantization)
+
+    @property
+    def model(self):
+        return model_registry.get(self.model_key)
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Chunks of the cleaned text packed to the model's max sequence length by its own tokenizer.
+        """
+        model = self.model
+        return self.preprocessor.chunk_text(
+            text, max_tokens=model.max_seq_length, tokenizer=getattr(model, "tokenizer", None),
+            overlap=self.chunk_overlap
+        )
 
     def get_jd_embedding(self, text: str):
         return self.model.encode(text, convert_to_tensor=True)
@@ -16,16 +96,170 @@ class BertRanker:
         embeddings = [self.get_jd_embedding(chunk) for chunk in chunks]
         return sum(embeddings) / len(embeddings)
 
-    def rank_resumes(self, job_desc: str, resumes: list):
-        job_desc_clean = self.preprocessor.clean_text(job_desc)
-        resumes_clean = [self.preprocessor.clean_text(r) for r in resumes]
+    def encode_resume(self, resume: str) -> np.ndarray:
+        """
+        Cleans a raw resume and returns its mean chunk embedding as a NumPy array,
+        suitable for caching and later scoring with score_embeddings().
+        """
+        return self.encode_resumes([resume])[0]
+
+    @timed("bert.encode")
+    def encode_resumes(self, resumes: List[str], cleaned: bool = False) -> np.ndarray:
+        """
+        Batched version of encode_resume().
+        Chunks of all resumes that are not in the chunk cache are deduplicated and encoded
+        in one length-sorted encode call, then mean-pooled back per resume.
+        :param cleaned: resumes were already passed through preprocessor.clean_text()
+        :return: matrix of shape (len(resumes), embedding_dim)
+        """
+        dim = self.model.get_sentence_embedding_dimension()
+        embeddings = np.zeros((len(resumes), dim), dtype=np.float32)
+        _, owners, chunk_matrix = self.encode_chunks(resumes, cleaned)
+        if not len(owners):
+            return embeddings
+
+        np.add.at(embeddings, owners, chunk_matrix)
+        counts = np.bincount(owners, minlength=len(resumes))
+        # Resumes without any text keep a zero embedding
+        embeddings[counts > 0] /= counts[counts > 0, None]
+        return embeddings
+
+    def encode_chunks(self, resumes: List[str], cleaned: bool = False) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Embeddings of every chunk of the resumes, taken from the chunk cache where possible.
+        :return: (chunks, position of the resume each chunk belongs to, chunk embedding matrix)
+        """
+        chunks = []
+        keys = []
+        owners = []
+        chunk_embeddings = {}
+        missing = {}
+        for i, resume in enumerate(resumes):
+            text = resume if cleaned else self.preprocessor.clean_text(resume)
+            for chunk in self.chunk(text):
+                key = self.chunk_cache.key(chunk)
+                chunks.append(chunk)
+                keys.append(key)
+                owners.append(i)
+                if key not in chunk_embeddings and key not in missing:
+                    cached = self.chunk_cache.get(key)
+                    if cached is None:
+                        missing[key] = chunk
+                    else:
+                        chunk_embeddings[key] = cached
+
+        if not keys:
+            dim = self.model.get_sentence_embedding_dimension()
+            return chunks, np.zeros(0, dtype=np.int64), np.zeros((0, dim), dtype=np.float32)
+
+        if missing:
+            # Longest first so each batch pads to similar lengths
+            missing_keys = sorted(missing, key=lambda key: len(missing[key]), reverse=True)
+            encoded = self.model.encode(
+                [missing[key] for key in missing_keys], batch_size=self.batch_size, convert_to_numpy=True
+            )
+            for key, embedding in zip(missing_keys, encoded):
+                # Copied so the cache does not keep the whole batch array alive
+                chunk_embeddings[key] = embedding.copy()
+                self.chunk_cache.put(key, chunk_embeddings[key])
+
+        return chunks, np.asarray(owners, dtype=np.int64), np.stack([chunk_embeddings[key] for key in keys])
+
+    @timed("bert.explain")
+    def best_chunks(self, resumes: List[str], jd_embedding: np.ndarray,
+                    cleaned: bool = False) -> List[Optional[Tuple[str, float]]]:
+        """
+        The chunk of each resume most similar to the job description, with its cosine score.
+        Chunks of recently encoded resumes are still in the chunk cache, so they are not re-encoded.
+        :return: per resume, (chunk, score), or None for a resume without text
+        """
+        chunks, owners, chunk_matrix = self.encode_chunks(resumes, cleaned)
+        scores = self.score_embeddings_many(np.reshape(jd_embedding, (1, -1)), chunk_matrix)[0]
+        best = [None] * len(resumes)
+        for chunk, owner, score in zip(chunks, owners.tolist(), scores.tolist()):
+            if best[owner] is None or score > best[owner][1]:
+                best[owner] = (chunk, score)
+        return best
+
+    @timed("bert.encode_jd")
+    def encode_job_description(self, job_desc: str) -> np.ndarray:
+        return self.model.encode(self.preprocessor.clean_text(job_desc), convert_to_numpy=True)
+
+    @timed("bert.encode_jd")
+    def encode_job_descriptions(self, job_descs: List[str]) -> np.ndarray:
+        """
+        Batched version of encode_job_description().
+        :return: matrix of shape (len(job_descs), embedding_dim)
+        """
+        cleaned = [self.preprocessor.clean_text(job_desc) for job_desc in job_descs]
+        return self.model.encode(cleaned, batch_size=self.batch_size, convert_to_numpy=True)
+
+    def score_embeddings(self, job_desc: str, resume_embeddings, jd_embedding: np.ndarray = None) -> np.ndarray:
+        """
+        Cosine similarity between the job description and precomputed resume embeddings,
+        computed as matrix-vector products over blocks of rows.
+        :param jd_embedding: job description embedding, if already computed by encode_job_description()
+        """
+        if jd_embedding is None:
+            jd_embedding = self.encode_job_description(job_desc)
+        return self.score_embeddings_many(np.reshape(jd_embedding, (1, -1)), resume_embeddings)[0]
+
+    @staticmethod
+    def score_embeddings_many(jd_embeddings: np.ndarray, resume_embeddings) -> np.ndarray:
+        """
+        Cosine similarity of every job description to every resume as one matrix product
+        per block of SCORE_BLOCK_ROWS resumes, so half-precision (or memory-mapped) embeddings
+        are never upcast all at once.
+        :return: matrix of shape (len(jd_embeddings), len(resume_embeddings))
+        """
+        jd_matrix = np.asarray(jd_embeddings, dtype=np.float32)
+        resume_matrix = np.asarray(resume_embeddings).reshape(-1, jd_matrix.shape[1])
+        jd_norms = np.linalg.norm(jd_matrix, axis=1)
+
+        scores = np.zeros((len(jd_matrix), len(resume_matrix)), dtype=np.float32)
+        for start in range(0, len(resume_matrix), SCORE_BLOCK_ROWS):
+            block = np.asarray(resume_matrix[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            norms = np.outer(jd_norms, np.linalg.norm(block, axis=1))
+            np.divide(jd_matrix @ block.T, norms, out=scores[:, start:start + len(block)], where=norms > 0)
+        return scores
+
+    def check_agreement(self, reference: "BertRanker", job_descs: List[str], resumes: List[str],
+                        max_score_diff: float = 0.05, min_top_k_overlap: float = 0.8, top_k: int = 10) -> Dict[str, float]:
+        """
+        Validates this ranker's backend against a reference ranker (normally the PyTorch one)
+        by scoring the same resumes for each job description with both.
+        :param max_score_diff: largest tolerated absolute difference of any cosine score
+        :param min_top_k_overlap: smallest tolerated fraction of shared resumes in the top_k of each ranking
+        :return: agreement statistics; raises ValueError if the backends disagree beyond tolerance
+        """
+        embeddings = self.encode_resumes(resumes)
+        reference_embeddings = reference.encode_resumes(resumes)
+        k = min(top_k, len(resumes))
+
+        diffs = []
+        overlaps = []
+        for job_desc in job_descs:
+            scores = self.score_embeddings(job_desc, embeddings)
+            reference_scores = reference.score_embeddings(job_desc, reference_embeddings)
+            diffs.append(np.abs(scores - reference_scores))
+            top = set(np.argsort(-scores, kind="stable")[:k].tolist())
+            reference_top = set(np.argsort(-reference_scores, kind="stable")[:k].tolist())
+            overlaps.append(len(top & reference_top) / k if k else 1.0)
 
-        jd_embedding = self.get_jd_embedding(job_desc_clean)
-        resume_embeddings = [self.get_resume_embedding(r) for r in resumes_clean]
+        diffs = np.concatenate(diffs) if diffs else np.zeros(0)
+        stats = {
+            "max_score_diff": float(diffs.max()) if diffs.size else 0.0,
+            "mean_score_diff": float(diffs.mean()) if diffs.size else 0.0,
+            "min_top_k_overlap": float(min(overlaps)) if overlaps else 1.0,
+        }
+        if stats["max_score_diff"] > max_score_diff or stats["min_top_k_overlap"] < min_top_k_overlap:
+            raise ValueError(f"Backend {self.model_key} disagrees with {reference.model_key}: {stats}")
+        return stats
 
-        cosine_scores = [util.pytorch_cos_sim(jd_embedding, emb).item() for emb in resume_embeddings]
-        ranked = sorted(zip(resumes, cosine_scores), key=lambda x: x[1], reverse=True)
-        return ranked   
+    def rank_resumes(self, job_desc: str, resumes: list, top_k: int = None, offset: int = 0):
+        resume_embeddings = self.encode_resumes(resumes)
+        cosine_scores = self.score_embeddings(job_desc, resume_embeddings)
+        return [(resumes[i], float(cosine_scores[i])) for i in top_k_order(cosine_scores, top_k, offset)]
 
 if __name__ == "__main__":
     # Initialize preprocessor and BertRanker
@@ -1,20 +1,18 @@
-import re
-from typing import List
-from sentence_transformers import SentenceTransformer
+from typing import List, Tuple
 from app.section_extractor import ResumeSectionExtractorFuzzy
+from app.text_normalizer import bert_clean
+
+# [CLS]/[SEP] (<s>/</s>) added by the tokenizer around every chunk
+SPECIAL_TOKENS = 2
 
 class BertPreprocessor:
-    def __init__(self, model_name="all-MiniLM-L6-v2", section_threshold=80, important_sections=None):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, section_threshold=80, important_sections=None):
         self.section_extractor = ResumeSectionExtractorFuzzy(threshold=section_threshold)
         self.important_sections = important_sections or ["experience", "skills", "projects"]
 
     # --- Text Cleaning ---
     def clean_text(self, text: str) -> str:
-        text = text.lower()
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[^a-z0-9\s.,]', '', text)
-        return text.strip()
+        return bert_clean(text.lower())
 
     # --- Section Extraction ---
     def extract_sections_text(self, text: str) -> str:
@@ -24,14 +22,59 @@ class BertPreprocessor:
         return " ".join(selected_texts)
 
     # --- Chunking for long resumes ---
-    def chunk_text(self, text: str, max_tokens: int = 512) -> List[str]:
-        tokens = text.split()
-        chunks = []
-        for i in range(0, len(tokens), max_tokens - 50):  # leave space for special tokens
-            chunk = tokens[i:i+max_tokens-50]
-            chunk_text = " ".join(chunk)
-            chunks.append(chunk_text)
-        return chunks
+    def chunk_text(self, text: str, max_tokens: int = 512, tokenizer=None, overlap: int = 0) -> List[str]:
+        """
+        Split text into chunks of whole words that fit the model's sequence length.
+        :param max_tokens: model max sequence length, including special tokens
+        :param tokenizer: model tokenizer; chunks are packed by its token counts. Without one,
+                          chunks are windows of max_tokens - 50 words
+        :param overlap: tokens (words without a tokenizer) repeated from the end of the previous chunk
+        """
+        words = text.split()
+        if tokenizer is None:
+            lengths = [1] * len(words)
+            budget = max_tokens - 50  # leave space for special tokens and subwords
+        else:
+            lengths = self.token_counts(words, tokenizer)
+            budget = max_tokens - SPECIAL_TOKENS
+        return [" ".join(words[start:end]) for start, end in self.pack_chunks(lengths, budget, overlap)]
+
+    @staticmethod
+    def token_counts(words: List[str], tokenizer) -> List[int]:
+        """
+        Tokens per word; each distinct word is tokenized once, in one batch.
+        """
+        unique = list(set(words))
+        if not unique:
+            return []
+        ids = tokenizer(unique, add_special_tokens=False)["input_ids"]
+        counts = {word: max(len(word_ids), 1) for word, word_ids in zip(unique, ids)}
+        return [counts[word] for word in words]
+
+    @staticmethod
+    def pack_chunks(lengths: List[int], budget: int, overlap: int = 0) -> List[Tuple[int, int]]:
+        """
+        Greedily pack consecutive items into (start, end) ranges of at most budget total length.
+        An item longer than the budget gets a range of its own.
+        """
+        ranges = []
+        start = 0
+        while start < len(lengths):
+            end, used = start, 0
+            while end < len(lengths) and (end == start or used + lengths[end] <= budget):
+                used += lengths[end]
+                end += 1
+            ranges.append((start, end))
+            if end == len(lengths):
+                break
+
+            # Start the next chunk up to `overlap` tokens back, but always move forward
+            next_start, carried = end, 0
+            while next_start - 1 > start and carried + lengths[next_start - 1] <= overlap:
+                next_start -= 1
+                carried += lengths[next_start]
+            start = next_start
+        return ranges
 
     # --- Full preprocessing: clean + extract sections + chunk ---
     def preprocess_resume(self, raw_text: str) -> List[str]:
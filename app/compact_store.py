@@ -0,0 +1,393 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Resume embeddings and word vectors are stored at half precision; scoring upcasts block by block
+EMBEDDING_DTYPE = np.float16
+
+# Terms a TermVocabulary holds as Python strings before packing them into its arrays
+PACK_NEW_TERMS = 1_000_000
+
+FNV_OFFSET_BASIS = np.uint64(0xcbf29ce484222325)
+FNV_PRIME = np.uint64(0x100000001b3)
+
+
+def save_array(path: str, array: np.ndarray):
+    """
+    np.save through a temp file, so arrays currently memory-mapped from `path` stay valid.
+    """
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, np.asarray(array))
+    os.replace(tmp_path, path)
+
+
+def save_json(path: str, obj):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def save_blob(path: str, chunks: Iterable[bytes]) -> List[int]:
+    """
+    Write byte strings back to back through a temp file (an mmap of `path` stays valid).
+    :return: offsets of the chunks in the file, plus the total length
+    """
+    offsets = [0]
+    with open(path + ".tmp", "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            offsets.append(offsets[-1] + len(chunk))
+    os.replace(path + ".tmp", path)
+    return offsets
+
+
+def map_blob(path: str, size: int, mmap: bool = True) -> np.ndarray:
+    if size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    if mmap:
+        return np.memmap(path, dtype=np.uint8, mode="r")
+    return np.fromfile(path, dtype=np.uint8)
+
+
+def term_hashes(terms: List[str]) -> np.ndarray:
+    """
+    Stable 64-bit FNV-1a hashes of terms (the built-in hash() is salted per process, so it
+    cannot be saved), computed one byte position at a time across all terms.
+    """
+    if not terms:
+        return np.zeros(0, dtype=np.uint64)
+    encoded = np.array([term.encode("utf-8") for term in terms], dtype=np.bytes_)
+    lengths = np.char.str_len(encoded)
+    # Longest first, so the terms still hashing at byte i are a prefix
+    order = np.argsort(-lengths, kind="stable")
+    codes = encoded[order].view(np.uint8).reshape(len(terms), -1).astype(np.uint64)
+    active = np.searchsorted(-lengths[order], -np.arange(codes.shape[1]), side="left")
+    hashes = np.full(len(terms), FNV_OFFSET_BASIS, dtype=np.uint64)
+    for i, n in enumerate(active):
+        hashes[:n] = (hashes[:n] ^ codes[:n, i]) * FNV_PRIME
+    result = np.empty_like(hashes)
+    result[order] = hashes
+    return result
+
+
+class TokenSets:
+    """
+    A list of string sets (keywords, skills) stored column-wise: every distinct string is
+    interned once in `vocabulary`, and each set is a sorted run of int32 ids in a CSR
+    layout (indptr/indices), instead of one Python set of str objects per resume.
+    Indexing returns a frozenset, so it can stand in for a list of sets.
+    """
+
+    def __init__(self, terms: List[str] = None):
+        self.terms: List[str] = list(terms or [])
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(self.terms)}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_sets(cls, sets: Iterable[Iterable[str]]) -> "TokenSets":
+        token_sets = cls()
+        token_sets.extend(sets)
+        return token_sets
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i: int) -> frozenset:
+        return frozenset(self.terms[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]])
+
+    def __iter__(self) -> Iterator[frozenset]:
+        return (self[i] for i in range(len(self)))
+
+    def extend(self, sets: Iterable[Iterable[str]]):
+        lengths = []
+        ids = []
+        for tokens in sets:
+            row = sorted({self._intern(token) for token in tokens})
+            ids.extend(row)
+            lengths.append(len(row))
+        self.indptr = np.concatenate([self.indptr, self.indptr[-1] + np.cumsum(lengths, dtype=np.int64)])
+        self.indices = np.concatenate([self.indices, np.asarray(ids, dtype=np.int32)])
+
+    def _intern(self, token: str) -> int:
+        token_id = self.vocabulary.get(token)
+        if token_id is None:
+            token_id = len(self.terms)
+            self.vocabulary[token] = token_id
+            self.terms.append(token)
+        return token_id
+
+    def take(self, rows) -> "TokenSets":
+        """
+        The sets at the given row positions (or boolean mask), sharing this vocabulary.
+        """
+        rows = np.flatnonzero(rows) if np.asarray(rows).dtype == bool else np.asarray(rows, dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        taken = TokenSets.__new__(TokenSets)
+        taken.terms, taken.vocabulary = self.terms, self.vocabulary
+        taken.indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        if len(rows):
+            positions = np.repeat(starts - taken.indptr[:-1], lengths) + np.arange(taken.indptr[-1])
+            taken.indices = np.asarray(self.indices[positions], dtype=np.int32)
+        else:
+            taken.indices = np.zeros(0, dtype=np.int32)
+        return taken
+
+    def incidence(self, columns: Dict[str, int]) -> csr_matrix:
+        """
+        Sparse 0/1 matrix (one row per set) with a 1 in the column of every member that is in `columns`.
+        """
+        column_of = np.full(len(self.terms), -1, dtype=np.int64)
+        for term, column in columns.items():
+            token_id = self.vocabulary.get(term)
+            if token_id is not None:
+                column_of[token_id] = column
+
+        mapped = column_of[self.indices] if len(self.indices) else np.zeros(0, dtype=np.int64)
+        kept = mapped >= 0
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        counts = np.bincount(rows[kept], minlength=len(self))
+        indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        data = np.ones(int(kept.sum()), dtype=np.float32)
+        return csr_matrix((data, mapped[kept].astype(np.int32), indptr), shape=(len(self), len(columns)))
+
+    # PERSISTENCE
+    def save(self, path: str, prefix: str):
+        save_array(os.path.join(path, f"{prefix}_indptr.npy"), self.indptr)
+        save_array(os.path.join(path, f"{prefix}_indices.npy"), self.indices)
+        save_json(os.path.join(path, f"{prefix}_terms.json"), self.terms)
+
+    @classmethod
+    def load(cls, path: str, prefix: str, mmap: bool = True) -> "TokenSets":
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, f"{prefix}_terms.json"), "r", encoding="utf-8") as f:
+            token_sets = cls(json.load(f))
+        token_sets.indptr = np.load(os.path.join(path, f"{prefix}_indptr.npy"), mmap_mode=mmap_mode)
+        token_sets.indices = np.load(os.path.join(path, f"{prefix}_indices.npy"), mmap_mode=mmap_mode)
+        return token_sets
+
+
+class TextStore:
+    """
+    Resume texts. Texts added in this process are kept in memory until save(); saved texts
+    stay in a memory-mapped UTF-8 file and are only decoded when accessed (e.g. for JD
+    skills outside the taxonomy, which are searched in the raw text).
+    """
+
+    def __init__(self):
+        self._blob: Optional[np.ndarray] = None
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._memory: List[str] = []
+        # Per row: >= 0 is a text in the file, -1 - i is self._memory[i]
+        self._refs = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __getitem__(self, i: int) -> str:
+        ref = self._refs[i]
+        if ref < 0:
+            return self._memory[-1 - ref]
+        return bytes(self._blob[self._offsets[ref]:self._offsets[ref + 1]]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+    def extend(self, texts: Iterable[str]):
+        texts = list(texts)
+        refs = -1 - np.arange(len(self._memory), len(self._memory) + len(texts), dtype=np.int64)
+        self._memory.extend(texts)
+        self._refs = np.concatenate([self._refs, refs])
+
+    def take(self, rows) -> "TextStore":
+        """
+        The texts at the given row positions (or boolean mask), without decoding them.
+        """
+        taken = TextStore()
+        taken._blob, taken._offsets, taken._memory = self._blob, self._offsets, self._memory
+        taken._refs = self._refs[rows]
+        return taken
+
+    def keep_rows(self, keep: np.ndarray):
+        self._refs = self._refs[keep]
+        # Drop in-memory texts no longer referenced
+        in_memory = self._refs < 0
+        if len(self._memory) > in_memory.sum():
+            order = -1 - self._refs[in_memory]
+            self._memory = [self._memory[i] for i in order]
+            self._refs[in_memory] = -1 - np.arange(len(order))
+
+    # PERSISTENCE
+    def save(self, path: str, prefix: str = "texts"):
+        """
+        Write the texts to `prefix`.bin (text by text, so saving never holds all texts encoded
+        at once) and switch to the memory-mapped file, releasing the in-memory texts.
+        """
+        blob_path = os.path.join(path, f"{prefix}.bin")
+        offsets = save_blob(blob_path, (text.encode("utf-8") for text in self))
+        save_array(os.path.join(path, f"{prefix}_offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        self._open(path, prefix, mmap=True)
+
+    @classmethod
+    def load(cls, path: str, prefix: str = "texts", mmap: bool = True) -> "TextStore":
+        store = cls()
+        store._open(path, prefix, mmap)
+        return store
+
+    def _open(self, path: str, prefix: str, mmap: bool):
+        self._offsets = np.load(os.path.join(path, f"{prefix}_offsets.npy"))
+        self._blob = map_blob(os.path.join(path, f"{prefix}.bin"), int(self._offsets[-1]), mmap)
+        self._memory = []
+        self._refs = np.arange(len(self._offsets) - 1, dtype=np.int64)
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "TextStore":
+        store = cls()
+        store.extend(texts)
+        return store
+
+
+class TermVocabulary:
+    """
+    Term -> column map of the TF-IDF matcher, sized for the millions of 1-3-grams of a large pool.
+    Terms are UTF-8 bytes in one blob, in column order, found through a sorted array of their
+    64-bit hashes (checked against the blob, so colliding hashes never merge two terms).
+    A saved vocabulary is memory-mapped back instead of being rebuilt as a dict of str objects;
+    only terms added since the last save() (at most PACK_NEW_TERMS) are held as Python strings.
+    """
+
+    def __init__(self):
+        # Packed terms: columns 0 .. n_packed - 1
+        self._blob = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._hash_columns = np.zeros(0, dtype=np.int32)
+        # Terms added since, in column order after the packed ones
+        self._new: Dict[str, int] = {}
+        self._new_terms: List[str] = []
+
+    @classmethod
+    def from_terms(cls, terms: Iterable[str]) -> "TermVocabulary":
+        vocabulary = cls()
+        vocabulary.extend(list(terms))
+        return vocabulary
+
+    def __len__(self):
+        return self._n_packed + len(self._new_terms)
+
+    @property
+    def _n_packed(self) -> int:
+        return len(self._offsets) - 1
+
+    def term(self, column: int) -> str:
+        if column >= self._n_packed:
+            return self._new_terms[column - self._n_packed]
+        return bytes(self._blob[self._offsets[column]:self._offsets[column + 1]]).decode("utf-8")
+
+    def lookup(self, terms: List[str]) -> np.ndarray:
+        """
+        :return: the column of each term, -1 for terms not in the vocabulary
+        """
+        get = self._new.get
+        columns = np.array([get(term, -1) for term in terms], dtype=np.int64)
+        missing = np.flatnonzero(columns < 0)
+        if not len(missing) or not self._n_packed:
+            return columns
+
+        hashes = term_hashes([terms[i] for i in missing])
+        positions = np.searchsorted(self._hashes, hashes)
+        candidate = positions < len(self._hashes)
+        candidate[candidate] = self._hashes[positions[candidate]] == hashes[candidate]
+        missing, hashes, positions = missing[candidate], hashes[candidate], positions[candidate]
+
+        # Confirm each hash match against the stored bytes
+        found = self._hash_columns[positions].astype(np.int64)
+        starts, ends = self._offsets[found].tolist(), self._offsets[found + 1].tolist()
+        blob = memoryview(self._blob)
+        for k, (i, column) in enumerate(zip(missing.tolist(), found.tolist())):
+            encoded = terms[i].encode("utf-8")
+            if blob[starts[k]:ends[k]] == encoded:
+                columns[i] = column
+            else:
+                columns[i] = self._find_colliding(encoded, hashes[k], int(positions[k]) + 1)
+        return columns
+
+    def _find_colliding(self, encoded: bytes, term_hash, position: int) -> int:
+        # Other packed terms with the same hash follow the first one in the sorted hashes
+        while position < len(self._hashes) and self._hashes[position] == term_hash:
+            column = int(self._hash_columns[position])
+            if bytes(self._blob[self._offsets[column]:self._offsets[column + 1]]) == encoded:
+                return column
+            position += 1
+        return -1
+
+    def extend(self, terms: List[str]) -> np.ndarray:
+        """
+        Append distinct terms that are not in the vocabulary yet.
+        :return: their columns
+        """
+        start = len(self)
+        self._new.update(zip(terms, range(start, start + len(terms))))
+        self._new_terms.extend(terms)
+        if len(self._new_terms) >= PACK_NEW_TERMS:
+            self._pack()
+        return np.arange(start, start + len(terms), dtype=np.int64)
+
+    def _pack(self):
+        if not self._new_terms:
+            return
+        encoded = [term.encode("utf-8") for term in self._new_terms]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        new_hashes = term_hashes(self._new_terms)
+        order = np.argsort(new_hashes, kind="stable")
+
+        # Merge into the sorted hashes; the packed arrays become in-memory copies until the next save()
+        at = np.searchsorted(self._hashes, new_hashes[order])
+        self._hashes = np.insert(self._hashes, at, new_hashes[order])
+        self._hash_columns = np.insert(self._hash_columns, at, (self._n_packed + order).astype(np.int32))
+        self._blob = np.concatenate([self._blob, np.frombuffer(b"".join(encoded), dtype=np.uint8)])
+        self._offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(lengths)])
+        self._new, self._new_terms = {}, []
+
+    def keep_columns(self, keep: np.ndarray):
+        """
+        Drop the terms whose column is False in `keep`; the remaining columns are renumbered in order.
+        """
+        self._pack()
+        self._blob = self._blob[np.repeat(keep, np.diff(self._offsets))]
+        self._offsets = np.concatenate([[0], np.cumsum(np.diff(self._offsets)[keep])]).astype(np.int64)
+        renumbered = (np.cumsum(keep) - 1).astype(np.int32)
+        kept = keep[self._hash_columns]
+        self._hashes = self._hashes[kept]
+        self._hash_columns = renumbered[self._hash_columns[kept]]
+
+    # PERSISTENCE
+    def save(self, path: str, prefix: str):
+        """
+        Write the packed arrays and switch to the memory-mapped files.
+        """
+        self._pack()
+        save_blob(os.path.join(path, f"{prefix}_terms.bin"), [memoryview(np.ascontiguousarray(self._blob))])
+        save_array(os.path.join(path, f"{prefix}_term_offsets.npy"), self._offsets)
+        save_array(os.path.join(path, f"{prefix}_term_hashes.npy"), self._hashes)
+        save_array(os.path.join(path, f"{prefix}_term_columns.npy"), self._hash_columns)
+        self._open(path, prefix, mmap=True)
+
+    @classmethod
+    def load(cls, path: str, prefix: str, mmap: bool = True) -> "TermVocabulary":
+        vocabulary = cls()
+        vocabulary._open(path, prefix, mmap)
+        return vocabulary
+
+    def _open(self, path: str, prefix: str, mmap: bool):
+        mmap_mode = "r" if mmap else None
+        self._offsets = np.load(os.path.join(path, f"{prefix}_term_offsets.npy"), mmap_mode=mmap_mode)
+        self._blob = map_blob(os.path.join(path, f"{prefix}_terms.bin"), int(self._offsets[-1]), mmap)
+        self._hashes = np.load(os.path.join(path, f"{prefix}_term_hashes.npy"), mmap_mode=mmap_mode)
+        self._hash_columns = np.load(os.path.join(path, f"{prefix}_term_columns.npy"), mmap_mode=mmap_mode)
+        self._new, self._new_terms = {}, []
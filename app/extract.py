@@ -1,48 +1,172 @@
 # from PyPDF2 import PdfReader
 import docx
+import io
 import os
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 import fitz
+from app.metrics import timed
+
+# Default per-file extraction limits: resumes that matter for ranking fit in the first pages,
+# while scanned or hostile uploads must not hold a worker's memory or time for long
+MAX_PAGES = 10
+MAX_CHARS = 200_000
+MAX_SECONDS = 10.0
+MAX_FILE_BYTES = 20 * 1024 * 1024
+
+
+class ResumeFile:
+    """
+    A resume held in memory (e.g. an upload): original file name and raw bytes.
+    Accepted everywhere a file path is, so uploads never need to touch the disk.
+    """
+
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self.content = content
+
 
 class Extractor:
-    @staticmethod
-    def extract_text_from_pdf(path):
-        doc = fitz.open(path)
-        text = ""
-        for page in doc:
-            text += page.get_text() + "\n"
-        return text
+    """
+    Text extraction from PDF, DOCX and TXT resumes, bounded per file: pages and paragraphs are
+    read one at a time and extraction stops at the first of max_pages, max_chars or max_seconds,
+    keeping the text read so far. Files larger than max_file_bytes are rejected unread.
+    """
+
+    def __init__(self, max_pages: Optional[int] = MAX_PAGES, max_chars: Optional[int] = MAX_CHARS,
+                 max_seconds: Optional[float] = MAX_SECONDS, max_file_bytes: Optional[int] = MAX_FILE_BYTES):
+        """
+        :param max_pages: PDF pages read per file (the first pages are kept)
+        :param max_chars: characters of text kept per file
+        :param max_seconds: time spent reading pages/paragraphs of one file
+        :param max_file_bytes: largest accepted file size
+        None disables a limit.
+        """
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_seconds = max_seconds
+        self.max_file_bytes = max_file_bytes
+
+    @property
+    def limits(self) -> Dict[str, Optional[float]]:
+        return {
+            "max_pages": self.max_pages,
+            "max_chars": self.max_chars,
+            "max_seconds": self.max_seconds,
+            "max_file_bytes": self.max_file_bytes,
+        }
 
     @staticmethod
-    def extract_text_from_docx(file_path):
-        text = ""
-        doc = docx.Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + " "
-        return text
+    def file_name(file) -> str:
+        return os.path.basename(file.filename if isinstance(file, ResumeFile) else file)
 
     @staticmethod
-    def extract_text_from_txt(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            text = f.read()
-        return text
+    def read_bytes(file) -> bytes:
+        if isinstance(file, ResumeFile):
+            return file.content
+        with open(file, "rb") as f:
+            return f.read()
+
+    def check_file_size(self, file):
+        size = len(file.content) if isinstance(file, ResumeFile) else os.path.getsize(file)
+        if self.max_file_bytes is not None and size > self.max_file_bytes:
+            raise ValueError(f"File too large: {size} bytes (limit {self.max_file_bytes})")
+
+    # STREAMING READERS
+    def iter_pdf_pages(self, path) -> Iterator[str]:
+        """
+        Text of each page, up to max_pages; the document is closed when the generator finishes or is closed.
+        """
+        if isinstance(path, ResumeFile):
+            doc = fitz.open(stream=path.content, filetype="pdf")
+        else:
+            doc = fitz.open(path)
+        with doc:
+            n_pages = doc.page_count if self.max_pages is None else min(doc.page_count, self.max_pages)
+            for i in range(n_pages):
+                yield doc.load_page(i).get_text()
 
     @staticmethod
-    def extract_text_from_file(file):
+    def iter_docx_paragraphs(file_path) -> Iterator[str]:
+        if isinstance(file_path, ResumeFile):
+            doc = docx.Document(io.BytesIO(file_path.content))
+        else:
+            doc = docx.Document(file_path)
+        for para in doc.paragraphs:
+            yield para.text
+
+    def join_within_limits(self, parts: Iterable[str], separator: str) -> Tuple[str, bool]:
+        """
+        Join parts (each followed by separator) in one pass, stopping at max_chars or max_seconds.
+        :return: (text, True if max_seconds stopped it before the last part)
+        """
+        deadline = None if self.max_seconds is None else time.monotonic() + self.max_seconds
+        remaining = self.max_chars
+        kept = []
+        timed_out = False
+        parts = iter(parts)
+        try:
+            for part in parts:
+                part += separator
+                if remaining is not None:
+                    part = part[:remaining]
+                    remaining -= len(part)
+                kept.append(part)
+                if remaining == 0:
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    timed_out = True
+                    break
+        finally:
+            # Closes the underlying document right away if extraction stopped early
+            close = getattr(parts, "close", None)
+            if close is not None:
+                close()
+        return "".join(kept), timed_out
+
+    # EXTRACTION
+    def extract_text_from_pdf(self, path):
+        return self.join_within_limits(self.iter_pdf_pages(path), "\n")[0]
+
+    def extract_text_from_docx(self, file_path):
+        return self.join_within_limits(self.iter_docx_paragraphs(file_path), " ")[0]
+
+    def extract_text_from_txt(self, file_path):
+        if isinstance(file_path, ResumeFile):
+            text = file_path.content.decode("utf-8")
+        else:
+            with open(file_path, "r", encoding="utf-8") as f:
+                text = f.read(-1 if self.max_chars is None else self.max_chars)
+        return text if self.max_chars is None else text[:self.max_chars]
+
+    def extract_text_from_file(self, file):
+        return self.extract_text(file)[0]
+
+    @timed("extraction")
+    def extract_text(self, file) -> Tuple[str, bool]:
+        """
+        :return: (text, True if max_seconds cut extraction short). Text cut by time depends on
+                 how busy the machine was, so it should not be cached as the file's text.
+        """
         filename = file.filename if hasattr(file, 'filename') else file
         ext = os.path.splitext(filename)[1].lower()
 
         if ext == ".pdf":
-            return Extractor.extract_text_from_pdf(file)
+            parts, separator = self.iter_pdf_pages, "\n"
         elif ext == ".docx":
-            return Extractor.extract_text_from_docx(file)
+            parts, separator = self.iter_docx_paragraphs, " "
         elif ext == ".txt":
-            return Extractor.extract_text_from_txt(file)
+            parts = None
         else:
             raise ValueError(f"Unsupported file type: {ext}")
+        self.check_file_size(file)
+        if parts is None:
+            return self.extract_text_from_txt(file), False
+        return self.join_within_limits(parts(file), separator)
 
 
 if __name__ == "__main__":
-    pdf_text = Extractor.extract_text_from_file("data/resumes/Achal_resume_college.pdf")
+    pdf_text = Extractor().extract_text_from_file("data/resumes/Achal_resume_college.pdf")
     # print(pdf_text)
     # docx_text = extract_text_from_file("data/resumes/sample_resume.docx")
     # txt_text = extract_text_from_file("data/resumes/sample_resume.txt")
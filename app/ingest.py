@@ -0,0 +1,250 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.extract import Extractor
+from app.metrics import metrics
+from app.section_extractor import ResumeSectionExtractorFuzzy
+
+# How often running extractions are checked against the per-file timeout
+POLL_INTERVAL = 0.05
+
+# Warm worker pools kept for later ingest() calls; pools of concurrent calls beyond this are shut down
+MAX_IDLE_POOLS = 2
+
+_worker_extractors = {}
+
+
+def extract_important_sections(resume_file, threshold: int = 80, important_sections=None,
+                               extraction_limits: Optional[Dict] = None) -> Tuple[Dict[str, str], Dict, bool]:
+    """
+    Extract text from one file and split it into important sections.
+    Runs inside the ingest worker processes; the section extractor is built once per process.
+    :param extraction_limits: Extractor keyword arguments (default limits if None)
+    :return: (important sections, stage timings to be recorded by the parent process,
+              whether the extraction time limit cut the text short)
+    """
+    key = (
+        threshold,
+        tuple(important_sections) if important_sections else None,
+        tuple(sorted(extraction_limits.items())) if extraction_limits else None,
+    )
+    if key not in _worker_extractors:
+        _worker_extractors[key] = ResumeSectionExtractorFuzzy(
+            threshold=threshold, important_sections=important_sections,
+            extractor=Extractor(**(extraction_limits or {}))
+        )
+    with metrics.request_timings(capture_only=True) as timings:
+        sections = _worker_extractors[key].extract_sections_from_file(resume_file)
+    return sections["important_sections"], timings, sections["timed_out"]
+
+
+class IngestResult:
+    def __init__(self, file, sections: Optional[Dict[str, str]] = None, error: Optional[str] = None,
+                 timings: Optional[Dict] = None, timed_out: bool = False):
+        self.file = file
+        self.sections = sections
+        self.error = error
+        self.timings = timings or {}
+        # Sections come from text cut short by the extraction time limit
+        self.timed_out = timed_out
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ResumeIngestor:
+    """
+    Extracts and sectionizes resume files concurrently in a process pool.
+
+    Each file is isolated: a file that raises, hangs past the timeout, or crashes
+    its worker process is reported as an error for that file only, and the rest
+    of the batch still completes.
+
+    Every ingest() call runs on a pool of its own (reused from earlier calls when one
+    is idle), so killing a pool over a hung or crashed file never touches the files
+    of a concurrent call.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: float = 60.0,
+                 threshold: int = 80, important_sections=None, extraction_limits: Optional[Dict] = None):
+        """
+        :param max_workers: worker processes per ingest() call (0 extracts in the calling thread, without isolation)
+        :param timeout: seconds a single file may spend in extraction before it is abandoned
+        :param threshold: fuzzy header threshold passed to ResumeSectionExtractorFuzzy
+        :param important_sections: canonical sections to keep (extractor default if None)
+        :param extraction_limits: per-file page/size/time limits passed to Extractor (its defaults if None)
+        """
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.timeout = timeout
+        self.threshold = threshold
+        self.important_sections = important_sections
+        self.extraction_limits = extraction_limits
+
+        # Workers are spawned, not forked, so they never inherit model threads or locks
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: List[ProcessPoolExecutor] = []
+        self._lock = threading.Lock()
+
+    def ingest(self, resume_files: List, on_done: Callable[[int, IngestResult], None] = None) -> List[IngestResult]:
+        """
+        :param on_done: optional callback(position, result) invoked once per finished file (successful or not),
+                        in completion order
+        :return: one IngestResult per file, in input order
+        """
+        results: List[Optional[IngestResult]] = [None] * len(resume_files)
+        on_done = on_done or (lambda i, result: None)
+
+        if self.max_workers == 0:
+            for i, file in enumerate(resume_files):
+                try:
+                    results[i] = self._result(file, self._extract(file))
+                except Exception as e:
+                    results[i] = IngestResult(file, error=f"{type(e).__name__}: {e}")
+                on_done(i, results[i])
+            return results
+
+        queue = list(range(len(resume_files)))
+        executor = self._checkout()
+        finished = False
+        try:
+            while queue:
+                suspects, requeue = self._run(resume_files, queue, results, executor, self.max_workers, on_done)
+                if not suspects and not requeue:
+                    break
+                # _run() terminated this call's pool; what is left continues on another one
+                executor = self._checkout()
+
+                # Files that were running when a worker hung or died are retried alone,
+                # so the offending file can be identified without failing its neighbours.
+                # If nothing was seen running, isolate everything left to guarantee progress.
+                if not suspects:
+                    suspects, requeue = requeue, []
+                for i in suspects:
+                    self._run_isolated(resume_files, i, results)
+                    on_done(i, results[i])
+                queue = requeue
+            finished = True
+        finally:
+            # A pool left with this call's files still running is not handed to the next call
+            if finished:
+                self._checkin(executor)
+            else:
+                self._terminate(executor)
+
+        return results
+
+    def _extract(self, resume_file) -> Tuple[Dict[str, str], Dict, bool]:
+        return extract_important_sections(resume_file, self.threshold, self.important_sections, self.extraction_limits)
+
+    @staticmethod
+    def _result(resume_file, extracted) -> IngestResult:
+        sections, timings, timed_out = extracted
+        metrics.merge(timings)
+        return IngestResult(resume_file, sections=sections, timings=timings, timed_out=timed_out)
+
+    def _submit(self, executor, resume_file):
+        return executor.submit(
+            extract_important_sections, resume_file, self.threshold, self.important_sections, self.extraction_limits
+        )
+
+    def _run(self, resume_files, indices, results, executor, workers: int, on_done=None):
+        """
+        Runs the given files on the executor until they finish or an incident
+        (timeout / broken pool) happens, in which case the executor is terminated.
+
+        At most one file per worker is submitted at a time: the executor reports queued
+        calls as running, so a deeper queue would start their timeout clocks early.
+        :return: (suspects, requeue) index lists; both empty if everything finished
+        """
+        waiting = deque(indices)
+        futures = {}
+        pending = set()
+        started = {}
+
+        while waiting or pending:
+            while waiting and len(pending) < workers:
+                i = waiting.popleft()
+                future = self._submit(executor, resume_files[i])
+                futures[future] = i
+                pending.add(future)
+
+            done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+
+            broken = []
+            for future in done:
+                i = futures[future]
+                try:
+                    results[i] = self._result(resume_files[i], future.result())
+                except BrokenProcessPool:
+                    broken.append(future)
+                    continue
+                except Exception as e:
+                    results[i] = IngestResult(resume_files[i], error=f"{type(e).__name__}: {e}")
+                if on_done is not None:
+                    on_done(i, results[i])
+
+            now = time.monotonic()
+            for future in pending:
+                if future.running():
+                    started.setdefault(future, now)
+            timed_out = [f for f in pending if now - started.get(f, now) > self.timeout]
+
+            if broken or timed_out:
+                self._terminate(executor)
+                unfinished = set(broken) | pending
+                suspects = [futures[f] for f in unfinished if f in started]
+                requeue = [futures[f] for f in unfinished if f not in started] + list(waiting)
+                return sorted(suspects), sorted(requeue)
+
+        return [], []
+
+    def _run_isolated(self, resume_files, i, results):
+        executor = ProcessPoolExecutor(max_workers=1, mp_context=self._context)
+        try:
+            suspects, requeue = self._run(resume_files, [i], results, executor, 1)
+        finally:
+            self._terminate(executor)
+        if suspects or requeue:
+            results[i] = IngestResult(
+                resume_files[i], error=f"Extraction timed out after {self.timeout}s or crashed its worker"
+            )
+
+    # POOL MANAGEMENT
+    def _checkout(self) -> ProcessPoolExecutor:
+        with self._lock:
+            while self._idle:
+                executor = self._idle.pop()
+                # A worker may have died while the pool sat idle
+                if not getattr(executor, "_broken", False):
+                    return executor
+                executor.shutdown(wait=False, cancel_futures=True)
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+
+    def _checkin(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_POOLS:
+                self._idle.append(executor)
+                return
+        executor.shutdown(wait=False)
+
+    @staticmethod
+    def _terminate(executor: ProcessPoolExecutor):
+        # ProcessPoolExecutor cannot cancel a running task, so hung workers are killed directly
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for executor in idle:
+            executor.shutdown(wait=True, cancel_futures=True)
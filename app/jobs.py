@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Stages reported by ResumePipeline.build_index() / rank_resumes_hybrid()
+JOB_STAGES = ["extraction", "tfidf", "bert", "keyword"]
+
+
+class Job:
+    """
+    A queued unit of pipeline work. The job function receives the job itself and
+    reports stage progress through job.update_progress(stage, done, total).
+    """
+
+    def __init__(self, func: Callable[["Job"], Any]):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.status = "queued"
+        self.progress = {stage: {"status": "pending", "done": 0, "total": 0} for stage in JOB_STAGES}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update_progress(self, stage: str, done: int, total: int):
+        with self._lock:
+            self.progress[stage] = {
+                "status": "done" if done >= total else "running",
+                "done": done,
+                "total": total,
+            }
+
+    def run(self):
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            self.result = self.func(self)
+            self.status = "done"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.status = "failed"
+        finally:
+            # The function's closure holds the job's inputs (e.g. uploaded files); only the result is kept
+            self.func = None
+            self.finished_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            progress = {stage: dict(p) for stage, p in self.progress.items()}
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Local worker queue: jobs are run by a fixed number of background threads.
+    Only the most recent max_jobs jobs are kept for status/result lookups.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: int = 100, max_jobs: int = 1000):
+        """
+        :param workers: number of worker threads running jobs concurrently
+        :param max_pending: queued jobs beyond which submit() raises JobQueueFull
+        :param max_jobs: number of jobs remembered (oldest finished jobs are forgotten first)
+        """
+        self.max_jobs = max_jobs
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, func: Callable[[Job], Any]) -> Job:
+        job = Job(func)
+        self._remember(job)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise JobQueueFull("Too many queued jobs")
+        return job
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _remember(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                if self._jobs[job_id].status in ("done", "failed"):
+                    del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                job.run()
+            finally:
+                self._queue.task_done()
+
+
+class InlineJobQueue(JobQueue):
+    """
+    In-process stand-in for JobQueue (e.g. for tests): jobs run synchronously inside submit().
+    """
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[[Job], Any]) -> Job:
+        job = Job(func)
+        self._remember(job)
+        job.run()
+        return job
+
+    def pending(self) -> int:
+        return 0
@@ -1,17 +1,18 @@
-import re
-from typing import List, Tuple
-import spacy
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-import nltk
+from typing import List, Set, Tuple
+import numpy as np
+from app.metrics import timed
+from app.ranking import top_k_order
+from app.models import model_registry, register_spacy_model
+from app.skill_matcher import SkillMatcher, get_skill_matcher, incidence_matrix, segment_fractions, set_incidence
+from app.text_normalizer import get_lemmatizer, get_stop_words, keyword_set, keyword_tokens
 
-nltk.download('stopwords')
-nltk.download('wordnet')
+# Skill phrases whose spaCy vectors are kept between requests
+MAX_CACHED_SKILL_VECTORS = 10_000
 
 class KeywordMatcher:
     """
     Hybrid keyword matcher combining:
-    1. Exact keyword overlap (general + skill)
+    1. Exact keyword overlap (general) and taxonomy skill overlap (SkillMatcher: multi-word skills and aliases)
     2. Semantic keyword similarity (using spaCy embeddings)
     """
 
@@ -19,108 +20,252 @@ class KeywordMatcher:
                  weight_skills: float = 0.4,
                  weight_general: float = 0.2,
                  weight_semantic: float = 0.4,
-                 semantic_threshold: float = 0.7):
+                 semantic_threshold: float = 0.7,
+                 spacy_model: str = "en_core_web_md"):
         """
         :param weight_skills: weight given to skill overlap
         :param weight_general: weight given to general word overlap
         :param weight_semantic: weight given to semantic similarity
         :param semantic_threshold: minimum similarity score to count as semantic match
+        :param spacy_model: spaCy model providing word vectors (loaded on first use)
         """
         self.weight_skills = weight_skills
         self.weight_general = weight_general
         self.weight_semantic = weight_semantic
         self.semantic_threshold = semantic_threshold
 
-        self.stop_words = set(stopwords.words('english'))
-        self.lemmatizer = WordNetLemmatizer()
-        self.nlp = spacy.load("en_core_web_md")
+        self.spacy_model_key = register_spacy_model(spacy_model)
+        self._skill_vectors = {}
+
+    # LAZILY LOADED RESOURCES
+    @property
+    def nlp(self):
+        return model_registry.get(self.spacy_model_key)
+
+    @property
+    def stop_words(self) -> frozenset:
+        return get_stop_words()
+
+    @property
+    def lemmatizer(self):
+        return get_lemmatizer()
+
+    @property
+    def skill_matcher(self) -> SkillMatcher:
+        return get_skill_matcher()
 
     # TEXT PROCESSING
     def preprocess_text(self, text: str) -> str:
-        text = text.lower()
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-        words = [self.lemmatizer.lemmatize(w) for w in text.split() if w not in self.stop_words]
-        return " ".join(words)
+        return " ".join(keyword_tokens(text.lower()))
 
     def extract_keywords(self, text: str) -> set:
         """
         Extracts keywords (alphanumeric) from text.
         """
-        text = text.lower()
-        keywords = re.findall(r"[a-zA-Z0-9_#+]+", text)
-        return set(keywords)
+        return keyword_set(text.lower())
+
+    def extract_skills(self, text: str) -> Set[str]:
+        """
+        Taxonomy skills mentioned in the text, cacheable per resume and reusable across JDs.
+        """
+        return self.skill_matcher.find_skills(text)
     
     # EXACT MATCH SCORES
-    def compute_overlap_score(self, resume_text: str, job_description: str) -> float:
+    def compute_overlap_score(self, resume_text: str, job_description: str, resume_keywords: set = None) -> float:
         """
         Computes normalized keyword overlap score (0–1).
+        :param resume_keywords: precomputed extract_keywords(resume_text), if available
         """
-        resume_words = self.extract_keywords(resume_text)
+        resume_words = resume_keywords if resume_keywords is not None else self.extract_keywords(resume_text)
         jd_words = self.extract_keywords(job_description)
         if not jd_words:
             return 0.0
         intersection = resume_words.intersection(jd_words)
         return len(intersection) / len(jd_words)
 
-    def compute_skill_overlap(self, resume_text: str, jd_skills: List[str]) -> float:
+    def compute_skill_overlap(self, resume_text: str, jd_skills: List[str], resume_skills: Set[str] = None) -> float:
         """
-        Computes overlap of known skills explicitly (0–1).
+        Computes overlap of known skills explicitly (0–1), including multi-word skills and aliases.
+        :param resume_skills: precomputed extract_skills(resume_text), if available
         """
-        resume_words = self.extract_keywords(resume_text)
-        jd_skill_set = set(skill.lower() for skill in jd_skills)
-        if not jd_skill_set:
-            return 0.0
-        intersection = resume_words.intersection(jd_skill_set)
-        return len(intersection) / len(jd_skill_set)
+        resume_skills = resume_skills if resume_skills is not None else self.extract_skills(resume_text)
+        return self.skill_matcher.skill_overlap(resume_skills, resume_text, self.skill_matcher.compile_jd_skills(jd_skills))
 
     # SEMANTIC MATCH SCORES
-    def compute_semantic_score(self, resume_text: str, jd_skills: List[str]) -> float:
+    def text_vector(self, text: str) -> np.ndarray:
         """
-        Computes semantic similarity score between resume and skill list (0–1).
-        Uses spaCy's word embeddings.
+        Average spaCy word vector of the text. Only the tokenizer and vector table
+        are used (Doc.vector does not depend on the tagger/parser/NER components).
         """
-        if not jd_skills:
-            return 0.0
+        return self.nlp.make_doc(text).vector
 
-        resume_doc = self.nlp(self.preprocess_text(resume_text))
-        matches = 0
+    def get_resume_vector(self, resume_text: str) -> np.ndarray:
+        """
+        spaCy document vector of the preprocessed resume, cacheable per resume.
+        """
+        return self.text_vector(self.preprocess_text(resume_text))
+
+    def get_skill_vectors(self, jd_skills: List[str]) -> np.ndarray:
+        """
+        Vectors of the JD skills; each skill phrase is only run through spaCy the first time it is seen.
+        """
+        vectors = []
+        for skill in jd_skills:
+            key = skill.lower()
+            # Read once and keep the local vector: another thread may clear the shared dict at any time
+            vector = self._skill_vectors.get(key)
+            if vector is None:
+                if len(self._skill_vectors) >= MAX_CACHED_SKILL_VECTORS:
+                    self._skill_vectors.clear()
+                vector = self.text_vector(key)
+                self._skill_vectors[key] = vector
+            vectors.append(vector)
+        return np.array(vectors, dtype=np.float32)
 
-        for kw in jd_skills:
-            kw_doc = self.nlp(kw.lower())
-            similarity = resume_doc.similarity(kw_doc)
-            if similarity >= self.semantic_threshold:
-                matches += 1
+    def compute_semantic_scores(self, resume_vectors, jd_skills: List[str], skill_vectors: np.ndarray = None) -> np.ndarray:
+        """
+        Fraction of JD skills whose cosine similarity to each resume vector reaches
+        semantic_threshold, computed as one normalized matrix product (0–1 per resume).
+        :param resume_vectors: matrix of get_resume_vector() outputs, one row per resume
+        :param skill_vectors: precomputed get_skill_vectors(jd_skills), if available
+        """
+        resume_vectors = np.asarray(resume_vectors, dtype=np.float32)
+        if not jd_skills or len(resume_vectors) == 0:
+            return np.zeros(len(resume_vectors))
 
+        if skill_vectors is None:
+            skill_vectors = self.get_skill_vectors(jd_skills)
+
+        # Zero vectors (no known words) never match, as with Doc.similarity
+        resume_unit = self._unit_rows(resume_vectors)
+        skill_unit = self._unit_rows(skill_vectors)
+        similarities = resume_unit @ skill_unit.T
+
+        matches = (similarities >= self.semantic_threshold).sum(axis=1)
         return matches / len(jd_skills)
 
+    def compute_semantic_scores_many(self, resume_vectors, jd_skill_lists: List[List[str]]) -> np.ndarray:
+        """
+        compute_semantic_scores() for several JD skill lists, as one matrix product over all their skills.
+        :return: matrix of shape (len(jd_skill_lists), len(resume_vectors))
+        """
+        resume_vectors = np.asarray(resume_vectors, dtype=np.float32)
+        flat = [skill for skills in jd_skill_lists for skill in skills]
+        if not flat or len(resume_vectors) == 0:
+            return np.zeros((len(jd_skill_lists), len(resume_vectors)))
+
+        similarities = self._unit_rows(self.get_skill_vectors(flat)) @ self._unit_rows(resume_vectors).T
+        return segment_fractions(similarities >= self.semantic_threshold, [len(skills) for skills in jd_skill_lists])
+
+    @staticmethod
+    def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def compute_semantic_score(self, resume_text: str, jd_skills: List[str], resume_vector: np.ndarray = None) -> float:
+        """
+        Computes semantic similarity score between resume and skill list (0–1).
+        Uses spaCy's word embeddings.
+        :param resume_vector: precomputed get_resume_vector() output, if available
+        """
+        if resume_vector is None:
+            resume_vector = self.get_resume_vector(resume_text)
+        return float(self.compute_semantic_scores([resume_vector], jd_skills)[0])
+
     # RANKING LOGIC
-    def rank_resumes(
-        self, resume_texts: List[str], resume_names: List[str],
-        job_description: str, jd_skills: List[str]
-    ) -> List[Tuple[str, float]]:
+    @timed("keyword.score")
+    def score_resumes(
+        self, resume_texts: List[str], job_description: str, jd_skills: List[str],
+        resume_vectors: List[np.ndarray] = None,
+        resume_keywords: List[set] = None,
+        skill_vectors: np.ndarray = None,
+        resume_skills: List[Set[str]] = None
+    ) -> np.ndarray:
         """
-        Ranks resumes based on:
+        Hybrid keyword score of every resume, aligned with resume_texts:
         - general overlap
         - skill overlap
         - semantic similarity
+        :param resume_vectors: optional precomputed resume vectors, aligned with resume_texts
+        :param resume_keywords: optional precomputed keyword sets (or TokenSets), aligned with resume_texts
+        :param skill_vectors: optional precomputed get_skill_vectors(jd_skills), e.g. when scoring resumes one at a time
+        :param resume_skills: optional precomputed extract_skills() sets (or TokenSets), aligned with resume_texts
+        """
+        if resume_vectors is None:
+            resume_vectors = [self.get_resume_vector(text) for text in resume_texts]
+        if resume_keywords is None:
+            resume_keywords = [self.extract_keywords(text) for text in resume_texts]
+        if resume_skills is None:
+            resume_skills = [self.extract_skills(text) for text in resume_texts]
+
+        exact_scores = self.exact_match_scores(
+            resume_texts, [(job_description, jd_skills)], resume_keywords, resume_skills
+        )[0]
+        semantic_scores = self.compute_semantic_scores(resume_vectors, jd_skills, skill_vectors)
+        return exact_scores + self.weight_semantic * semantic_scores
+
+    @timed("keyword.score")
+    def score_resumes_many(
+        self, resume_texts: List[str], jobs: List[Tuple[str, List[str]]],
+        resume_vectors: List[np.ndarray] = None,
+        resume_keywords: List[set] = None,
+        resume_skills: List[Set[str]] = None
+    ) -> np.ndarray:
+        """
+        score_resumes() for several (job description, jd_skills) pairs at once. Resume-side inputs
+        are computed once, and each component is scored for all JDs as one matrix product.
+        :return: matrix of shape (len(jobs), len(resume_texts))
         """
-        scores = []
+        if resume_vectors is None:
+            resume_vectors = [self.get_resume_vector(text) for text in resume_texts]
+        if resume_keywords is None:
+            resume_keywords = [self.extract_keywords(text) for text in resume_texts]
+        if resume_skills is None:
+            resume_skills = [self.extract_skills(text) for text in resume_texts]
 
-        for text, name in zip(resume_texts, resume_names):
-            general_score = self.compute_overlap_score(text, job_description)
-            skill_score = self.compute_skill_overlap(text, jd_skills)
-            semantic_score = self.compute_semantic_score(text, jd_skills)
+        exact_scores = self.exact_match_scores(resume_texts, jobs, resume_keywords, resume_skills)
+        semantic_scores = self.compute_semantic_scores_many(resume_vectors, [skills for _, skills in jobs])
+        return exact_scores + self.weight_semantic * semantic_scores
+
+    def exact_match_scores(self, resume_texts: List[str], jobs: List[Tuple[str, List[str]]],
+                           resume_keywords, resume_skills) -> np.ndarray:
+        """
+        Weighted general + skill overlap of every (job, resume) pair, each computed for all
+        JDs as one sparse product over the union of their words / taxonomy skills.
+        :return: matrix of shape (len(jobs), len(resume_texts))
+        """
+        # General overlap: shared words counted over the union of the JD vocabularies
+        jd_words = [self.extract_keywords(jd) for jd, _ in jobs]
+        columns = {}
+        jd_cols = [[columns.setdefault(word, len(columns)) for word in words] for words in jd_words]
+        jd_matrix = incidence_matrix(jd_cols, len(columns))
+        resume_matrix = set_incidence(resume_keywords, columns)
+        shared = (jd_matrix @ resume_matrix.T).toarray()
+        jd_sizes = np.array([len(words) for words in jd_words], dtype=np.float64)[:, None]
+        general_scores = np.divide(shared, jd_sizes, out=np.zeros_like(shared), where=jd_sizes > 0)
 
-            final_score = (
-                self.weight_general * general_score +
-                self.weight_skills * skill_score +
-                self.weight_semantic * semantic_score
-            )
+        compiled_skills = [self.skill_matcher.compile_jd_skills(skills) for _, skills in jobs]
+        skill_scores = self.skill_matcher.skill_overlap_matrix(resume_skills, resume_texts, compiled_skills)
 
-            scores.append((name, final_score))
+        return self.weight_general * general_scores + self.weight_skills * skill_scores
 
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores
+    def rank_resumes(
+        self, resume_texts: List[str], resume_names: List[str],
+        job_description: str, jd_skills: List[str],
+        resume_vectors: List[np.ndarray] = None,
+        resume_keywords: List[set] = None,
+        resume_skills: List[Set[str]] = None,
+        top_k: int = None,
+        offset: int = 0
+    ) -> List[Tuple[str, float]]:
+        """
+        Ranks resumes by score_resumes(), best first.
+        :param top_k: only return this many resumes, starting after the best `offset` ones
+        """
+        scores = self.score_resumes(
+            resume_texts, job_description, jd_skills, resume_vectors, resume_keywords, resume_skills=resume_skills
+        )
+        return [(resume_names[i], float(scores[i])) for i in top_k_order(scores, top_k, offset)]
 
 
 def main():
@@ -1,12 +1,31 @@
-from fastapi import FastAPI, UploadFile, Form
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-import shutil
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import List, Optional
+import asyncio
+import functools
+import json
 import os
+import threading
 
+from app.extract import ResumeFile
+from app.jobs import JobQueue, JobQueueFull
+from app.metrics import metrics
+from app.models import model_registry
 from app.pipeline import ResumePipeline
+from app.resume_index import ReadWriteLock, ResumeIndex
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models in the background so the worker starts serving immediately
+    threading.Thread(target=model_registry.warmup, daemon=True).start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,31 +34,436 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+CACHE_DIR = "cache"
+INDEX_DIR = "index"
+
+# CPU-bound pipeline work runs off the event loop, at most MAX_CONCURRENT_JOBS at a time;
+# beyond MAX_QUEUED_JOBS waiting requests the server answers 503 instead of queueing forever
+MAX_CONCURRENT_JOBS = 2
+MAX_QUEUED_JOBS = 8
+
+pipeline_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS)
+pipeline_slots = threading.BoundedSemaphore(MAX_CONCURRENT_JOBS + MAX_QUEUED_JOBS)
+
+# Large batches go through the asynchronous job API instead of holding a request open
+MAX_PENDING_BATCH_JOBS = 100
+job_queue = JobQueue(workers=MAX_CONCURRENT_JOBS, max_pending=MAX_PENDING_BATCH_JOBS)
+
+# BERT encoder backend: "torch", or "onnx" for ONNX Runtime with optional int8 quantization
+# (BERT_QUANTIZATION=avx2/avx512/avx512_vnni); ONNX needs `pip install "sentence-transformers[onnx]"`
+BERT_BACKEND = os.environ.get("BERT_BACKEND", "torch")
+BERT_QUANTIZATION = os.environ.get("BERT_QUANTIZATION") or None
+
+# Process-wide stage metrics served at /metrics; per-request breakdowns work either way
+metrics.enabled = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+# Models are shared by all requests; each request ranks its own candidate index
+pipeline = ResumePipeline(cache_dir=CACHE_DIR, bert_backend=BERT_BACKEND, bert_quantization=BERT_QUANTIZATION)
+
+# Persistent candidate pool, memory-mapped from disk if it was saved before
+if os.path.exists(os.path.join(INDEX_DIR, "index_meta.json")):
+    resume_pool = ResumeIndex.load(INDEX_DIR)
+else:
+    resume_pool = ResumeIndex()
+# Rankings share the pool (read); adding and removing resumes replaces its arrays (write)
+resume_pool_lock = ReadWriteLock()
+
+
+def collect_runtime_metrics():
+    cache = pipeline.cache
+    if cache is not None:
+        yield "cache_hits_total", "counter", "Resume feature cache hits", [({}, cache.hits)]
+        yield "cache_misses_total", "counter", "Resume feature cache misses", [({}, cache.misses)]
+    chunk_cache = pipeline.bert_matcher.chunk_cache
+    yield "bert_chunk_cache_hits_total", "counter", "BERT chunk embedding cache hits", [({}, chunk_cache.hits)]
+    yield "bert_chunk_cache_misses_total", "counter", "BERT chunk embedding cache misses", [({}, chunk_cache.misses)]
+    yield "model_loaded", "gauge", "Whether a model is loaded", [
+        ({"model": key}, int(status["loaded"])) for key, status in model_registry.status()["models"].items()
+    ]
+    yield "model_load_seconds", "gauge", "Time taken to load a model", [
+        ({"model": key}, seconds) for key, seconds in model_registry.load_times.items()
+    ]
+    yield "pool_resumes", "gauge", "Resumes in the persistent candidate pool", [({}, len(resume_pool))]
+    yield "jobs_pending", "gauge", "Batch jobs waiting in the job queue", [({}, job_queue.pending())]
+
+
+metrics.register_collector(collect_runtime_metrics)
+
+# Pool ranking is two-stage: only the top N resumes by TF-IDF and by BERT nearest-neighbour
+# search are fully scored (pools up to this size are scored exhaustively)
+POOL_RETRIEVE_TOP_N = 500
+
+
+# Uploads are read in pieces of this size, so an oversized one is rejected before it is held in memory
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+async def read_uploads(files: List[UploadFile]) -> List[ResumeFile]:
+    # Uploads are kept in memory; extraction reads PDF/DOCX straight from the bytes
+    max_bytes = pipeline.extractor.max_file_bytes
+    uploads = []
+    for file in files or []:
+        chunks = []
+        size = 0
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise HTTPException(
+                    status_code=413, detail=f"{file.filename} is larger than the {max_bytes} byte limit"
+                )
+            chunks.append(chunk)
+        uploads.append(ResumeFile(file.filename, b"".join(chunks)))
+    return uploads
+
+
+def acquire_pipeline_slot():
+    if not pipeline_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Server busy, try again later", headers={"Retry-After": "5"})
+
+
+async def run_pipeline(func, *args, **kwargs):
+    """
+    Run blocking pipeline work in the worker pool, rejecting the request when the queue is full.
+    """
+    acquire_pipeline_slot()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pipeline_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        pipeline_slots.release()
+
+
+def format_results(ranked_results):
+    results = []
+    for name, score, *breakdown in ranked_results:
+        result = {"name": name, "score": round(score, 3)}
+        if breakdown:
+            result["scores"] = {ranker: round(value, 4) for ranker, value in breakdown[0].items()}
+        if len(breakdown) > 1:
+            result["explanation"] = format_explanation(breakdown[1])
+        results.append(result)
+    return results
+
+
+def format_explanation(explanation):
+    best_chunk = explanation["best_chunk"]
+    return {
+        "tfidf_terms": [{"term": term, "weight": round(weight, 4)} for term, weight in explanation["tfidf_terms"]],
+        "matched_skills": explanation["matched_skills"],
+        "missing_skills": explanation["missing_skills"],
+        "best_chunk": None if best_chunk is None else {"text": best_chunk[0], "score": round(best_chunk[1], 4)},
+    }
+
+
+def check_page(top_k: Optional[int], offset: int):
+    if top_k is not None and top_k <= 0:
+        raise HTTPException(status_code=400, detail="top_k must be positive")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must not be negative")
+
+
+def format_errors(errors):
+    return [{"name": name, "error": error} for name, error in errors.items()]
+
+
+def parse_jobs(jobs: str):
+    """
+    :param jobs: JSON list of {"job_description": str, "jd_skills": comma-separated str or list of str}
+    :return: [(job description, [skill, ...]), ...]
+    """
+    try:
+        items = json.loads(jobs)
+        parsed = []
+        for item in items:
+            skills = item["jd_skills"]
+            skills = skills.split(",") if isinstance(skills, str) else skills
+            parsed.append((str(item["job_description"]), [str(s).strip() for s in skills]))
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid jobs: {type(e).__name__}: {e}")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="jobs must contain at least one job description")
+    return parsed
+
+
+def format_timings(timings):
+    return {stage: {"seconds": round(t["seconds"], 4), "count": t["count"]} for stage, t in sorted(timings.items())}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    status = model_registry.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-pipeline = ResumePipeline()
 
 @app.post("/rank_resumes/")
 async def rank_resumes(
+    job_description: str = Form(...),
+    jd_skills: str = Form(...),
+    files: List[UploadFile] = None,
+    include_timings: bool = Form(False),
+    top_k: Optional[int] = Form(None),
+    offset: int = Form(0),
+    include_scores: bool = Form(False),
+    explain: bool = Form(False),
+    cascade: bool = Form(False)
+):
+    """
+    :param top_k: only return top_k resumes after the best `offset` ones
+    :param cascade: with top_k, skip BERT encoding for resumes that cannot reach the page. Faster, but
+                    BERT scores are normalized over the encoded resumes only, so scores and order can
+                    differ from the full ranking and are not comparable across pages
+    :param include_scores: add each returned resume's normalized TF-IDF, BERT and keyword scores
+    :param explain: add the scores and an explanation of each returned resume: top TF-IDF terms,
+                    matched/missing JD skills and best-matching BERT chunk
+    """
+    check_page(top_k, offset)
+    if cascade and top_k is None:
+        raise HTTPException(status_code=400, detail="cascade requires top_k")
+    resume_files = await read_uploads(files)
+    jd_skills_list = [s.strip() for s in jd_skills.split(",")]
+
+    def rank():
+        with metrics.request_timings() as timings:
+            if cascade:
+                ranked_results, errors, stats = pipeline.rank_resumes_cascade(
+                    resume_files, job_description, jd_skills_list, top_k, offset=offset,
+                    breakdown=include_scores, explain=explain
+                )
+                total = stats["total"]
+            else:
+                candidates, errors = pipeline.build_index(resume_files)
+                ranked_results = []
+                # Nothing to rank if every upload failed; the per-file errors are still reported
+                if len(candidates):
+                    ranked_results = pipeline.rank_resumes_hybrid(
+                        candidates, job_description, jd_skills_list, top_k=top_k, offset=offset,
+                        breakdown=include_scores, explain=explain
+                    )
+                total = len(candidates)
+        return ranked_results, errors, total, timings
+
+    ranked_results, errors, total, timings = await run_pipeline(rank)
+
+    # Format for frontend
+    response = {
+        "results": format_results(ranked_results),
+        "total": total,
+        "offset": offset,
+        "errors": format_errors(errors),
+    }
+    if include_timings:
+        response["timings"] = format_timings(timings)
+    return response
+
+
+@app.post("/rank_resumes/bulk/")
+async def rank_resumes_bulk(
+    jobs: str = Form(...),
+    files: List[UploadFile] = None,
+    include_timings: bool = Form(False),
+    top_k: Optional[int] = Form(None),
+    offset: int = Form(0)
+):
+    """
+    Ranks one set of resumes against many job descriptions: resumes are extracted and encoded once.
+    :param jobs: JSON list of {"job_description": ..., "jd_skills": ...}
+    :param top_k: only return top_k resumes per job, after the best `offset` ones
+    :return: "rankings" with one result list per job, in the order of jobs
+    """
+    check_page(top_k, offset)
+    jobs_list = parse_jobs(jobs)
+    resume_files = await read_uploads(files)
+
+    def rank():
+        with metrics.request_timings() as timings:
+            candidates, errors = pipeline.build_index(resume_files)
+            if len(candidates):
+                rankings = pipeline.rank_resumes_hybrid_many(candidates, jobs_list, top_k=top_k, offset=offset)
+            else:
+                rankings = [[] for _ in jobs_list]
+        return rankings, errors, timings
+
+    rankings, errors, timings = await run_pipeline(rank)
+
+    response = {
+        "rankings": [{"job": i, "results": format_results(ranking)} for i, ranking in enumerate(rankings)],
+        "errors": format_errors(errors),
+    }
+    if include_timings:
+        response["timings"] = format_timings(timings)
+    return response
+
+
+@app.post("/rank_resumes/stream/")
+async def rank_resumes_stream(
+    request: Request,
     job_description: str = Form(...),
     jd_skills: str = Form(...),
     files: List[UploadFile] = None
 ):
-    saved_files = []
-    for file in files:
-        path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        saved_files.append(path)
+    """
+    Same ranking as /rank_resumes/, streamed as resumes finish processing: "partial" events with
+    provisional keyword/term scores, "error" events, "refined" events once BERT scores are in,
+    and a final "ranking" event with the authoritative results.
+    Sent as Server-Sent Events if the client accepts text/event-stream, NDJSON otherwise.
+    """
+    resume_files = await read_uploads(files)
+    jd_skills_list = [s.strip() for s in jd_skills.split(",")]
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def rank():
+        try:
+            ranked_results, errors = pipeline.rank_resumes_streaming(resume_files, job_description, jd_skills_list, emit)
+            emit({"event": "ranking", "results": format_results(ranked_results), "errors": format_errors(errors)})
+        except Exception as e:
+            emit({"event": "failed", "error": f"{type(e).__name__}: {e}"})
+        finally:
+            emit(None)
+
+    # The slot is taken before streaming starts, so a busy server still answers 503
+    acquire_pipeline_slot()
+    future = loop.run_in_executor(pipeline_executor, rank)
+    future.add_done_callback(lambda _: pipeline_slots.release())
+
+    async def stream():
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            data = json.dumps(event)
+            yield f"event: {event['event']}\ndata: {data}\n\n" if sse else data + "\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+
+@app.post("/index/resumes/")
+async def add_to_index(files: List[UploadFile] = None):
+    resume_files = await read_uploads(files)
+
+    def add():
+        with resume_pool_lock.write():
+            _, errors = pipeline.build_index(resume_files, index=resume_pool)
+            resume_pool.save(INDEX_DIR)
+            return errors
+
+    errors = await run_pipeline(add)
+    return {"count": len(resume_pool), "errors": format_errors(errors)}
+
+
+@app.delete("/index/resumes/")
+async def remove_from_index(names: str = Form(...)):
+    def remove():
+        with resume_pool_lock.write():
+            resume_pool.remove([n.strip() for n in names.split(",")])
+            resume_pool.save(INDEX_DIR)
+
+    await run_pipeline(remove)
+    return {"count": len(resume_pool)}
 
+
+@app.post("/index/rank/")
+async def rank_index(
+    job_description: str = Form(...),
+    jd_skills: str = Form(...),
+    include_timings: bool = Form(False),
+    top_k: Optional[int] = Form(None),
+    offset: int = Form(0),
+    include_scores: bool = Form(False),
+    explain: bool = Form(False)
+):
+    """
+    :param top_k: only return top_k resumes after the best `offset` ones
+    :param include_scores: add each returned resume's normalized TF-IDF, BERT and keyword scores
+    :param explain: add the scores and an explanation of each returned resume (see /rank_resumes/)
+    """
+    check_page(top_k, offset)
     jd_skills_list = [s.strip() for s in jd_skills.split(",")]
-    pipeline.load_resumes(saved_files)
-    ranked_results = pipeline.rank_resumes_hybrid(job_description, jd_skills_list)
+    # Deep pages need a larger shortlist than the default
+    retrieve_top_n = POOL_RETRIEVE_TOP_N if top_k is None else max(POOL_RETRIEVE_TOP_N, offset + top_k)
 
-    
-    # Format for frontend
-    response = [
-        {"name": name, "score": round(score, 3)} for name, score in ranked_results
-    ]
-    return {"results": response}
+    def rank():
+        with resume_pool_lock.read(), metrics.request_timings() as timings:
+            ranked_results = []
+            if len(resume_pool):
+                ranked_results = pipeline.rank_resumes_hybrid(
+                    resume_pool, job_description, jd_skills_list, retrieve_top_n=retrieve_top_n,
+                    top_k=top_k, offset=offset, breakdown=include_scores, explain=explain
+                )
+            total = len(resume_pool)
+        return ranked_results, total, timings
+
+    ranked_results, total, timings = await run_pipeline(rank)
+    response = {"results": format_results(ranked_results), "total": total, "offset": offset}
+    if include_timings:
+        response["timings"] = format_timings(timings)
+    return response
+
+
+@app.post("/jobs/", status_code=202)
+async def submit_job(
+    job_description: str = Form(...),
+    jd_skills: str = Form(...),
+    files: List[UploadFile] = None
+):
+    resume_files = await read_uploads(files)
+    jd_skills_list = [s.strip() for s in jd_skills.split(",")]
+
+    def rank(job):
+        candidates, errors = pipeline.build_index(resume_files, progress=job.update_progress)
+        ranked_results = []
+        if len(candidates):
+            ranked_results = pipeline.rank_resumes_hybrid(
+                candidates, job_description, jd_skills_list, progress=job.update_progress
+            )
+        return {"results": format_results(ranked_results), "errors": format_errors(errors)}
+
+    try:
+        job = job_queue.submit(rank)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many queued jobs, try again later", headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status}
+
+
+def get_job_or_404(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return get_job_or_404(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str, top_k: Optional[int] = None, offset: int = 0):
+    check_page(top_k, offset)
+    job = get_job_or_404(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+    results = job.result["results"]
+    end = None if top_k is None else offset + top_k
+    return {
+        "results": results[offset:end],
+        "total": len(results),
+        "offset": offset,
+        "errors": job.result["errors"],
+    }
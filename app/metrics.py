@@ -0,0 +1,165 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (le) of the histogram buckets
+SECONDS_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+SIZE_BUCKETS = [1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000]
+
+# Timings of the request (or ingest worker call) running in the current context, if collected
+_request_timings: ContextVar[Optional[Dict[str, Dict[str, float]]]] = ContextVar("request_timings", default=None)
+# True inside an ingest worker: timings are sent back to the parent instead of recorded locally
+_capture_only: ContextVar[bool] = ContextVar("capture_only", default=False)
+
+# (metric name, type, help, [(labels, value), ...]) produced on every scrape
+Collected = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide stage timers and document size histograms, rendered in the
+    Prometheus text format by render().
+
+    Stages are timed with timer()/timed(); when metrics are disabled and no
+    per-request breakdown is being collected they cost one flag check.
+    """
+
+    def __init__(self, enabled: bool = True, namespace: str = "smarthire"):
+        self.enabled = enabled
+        self.namespace = namespace
+        self._stages: Dict[str, Histogram] = {}
+        self._sizes: Dict[str, Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Collected]]] = []
+        self._lock = threading.Lock()
+
+    def active(self) -> bool:
+        return self.enabled or _request_timings.get() is not None
+
+    # RECORDING
+    def observe(self, stage: str, seconds: float):
+        timings = _request_timings.get()
+        if timings is not None:
+            entry = timings.setdefault(stage, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+        if self.enabled and not _capture_only.get():
+            with self._lock:
+                self._stages.setdefault(stage, Histogram(SECONDS_BUCKETS)).observe(seconds)
+
+    def observe_size(self, name: str, value: float):
+        if self.enabled and not _capture_only.get():
+            with self._lock:
+                self._sizes.setdefault(name, Histogram(SIZE_BUCKETS)).observe(value)
+
+    def merge(self, timings: Optional[Dict[str, Dict[str, float]]]):
+        """
+        Record timings collected elsewhere, e.g. returned by an ingest worker process.
+        """
+        for stage, entry in (timings or {}).items():
+            self.observe(stage, entry["seconds"])
+
+    @contextmanager
+    def timer(self, stage: str):
+        if not self.active():
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def request_timings(self, capture_only: bool = False):
+        """
+        Collect a per-stage breakdown ({stage: {"seconds", "count"}}) of the work done
+        in this context, even when metrics are disabled.
+        :param capture_only: only collect into the breakdown, without recording process-wide
+        """
+        timings: Dict[str, Dict[str, float]] = {}
+        token = _request_timings.set(timings)
+        capture_token = _capture_only.set(capture_only)
+        try:
+            yield timings
+        finally:
+            _capture_only.reset(capture_token)
+            _request_timings.reset(token)
+
+    # EXPOSITION
+    def register_collector(self, collector: Callable[[], Iterable[Collected]]):
+        """
+        :param collector: called on every render(), returns current values such as cache hit counts
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, "stage_seconds", "Time spent per pipeline stage", "stage", self._stages)
+            self._render_histograms(lines, "document_size", "Size of processed resumes", "measure", self._sizes)
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                full_name = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{full_name}{self._labels(labels)} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _render_histograms(self, lines: List[str], name: str, help_text: str, label: str, histograms: Dict[str, Histogram]):
+        if not histograms:
+            return
+        full_name = f"{self.namespace}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} histogram")
+        for key, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + [float("inf")], histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{full_name}_bucket{self._labels({label: key, 'le': le})} {cumulative}")
+            lines.append(f"{full_name}_sum{self._labels({label: key})} {histogram.sum}")
+            lines.append(f"{full_name}_count{self._labels({label: key})} {histogram.count}")
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> str:
+        if not labels:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+        return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels.keys(), escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+def timed(stage: str):
+    """
+    Decorator recording each call of the function under the given stage name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.active():
+                return func(*args, **kwargs)
+            with metrics.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# en_core_web_md components we never run: only the tokenizer and the static
+# vector table are needed for Doc.vector
+SPACY_UNUSED_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+# Encoder backends for SentenceTransformer models ("onnx" needs sentence-transformers[onnx])
+ENCODER_BACKENDS = ["torch", "onnx"]
+
+# Where exported / quantized ONNX models are kept between restarts
+ONNX_EXPORT_DIR = "models"
+
+
+class ModelRegistry:
+    """
+    Lazily loads heavy models on first use and shares them across the process.
+
+    Models are registered by key with a loader callable; nothing is loaded (or
+    imported) until get() is called for that key or warmup() runs.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self.load_times: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def register(self, key: str, loader: Callable[[], Any]) -> str:
+        with self._lock:
+            if key not in self._loaders:
+                self._loaders[key] = loader
+                self._key_locks[key] = threading.Lock()
+        return key
+
+    def get(self, key: str) -> Any:
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        if key not in self._loaders:
+            raise KeyError(f"Model not registered: {key}")
+
+        # One lock per key so different models can load concurrently
+        with self._key_locks[key]:
+            if key not in self._models:
+                start = time.perf_counter()
+                try:
+                    self._models[key] = self._loaders[key]()
+                except Exception as e:
+                    self._errors[key] = str(e)
+                    raise
+                self._errors.pop(key, None)
+                self.load_times[key] = time.perf_counter() - start
+        return self._models[key]
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._models
+
+    def warmup(self):
+        """
+        Load every registered model, e.g. from a background thread at startup.
+        Failures are recorded in status() instead of raised.
+        """
+        for key in list(self._loaders):
+            try:
+                self.get(key)
+            except Exception as e:
+                print(f"Failed to load model {key}: {e}")
+
+    def ready(self) -> bool:
+        return all(key in self._models for key in self._loaders)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready(),
+            "models": {
+                key: {
+                    "loaded": key in self._models,
+                    "load_time": self.load_times.get(key),
+                    "error": self._errors.get(key),
+                }
+                for key in list(self._loaders)
+            },
+        }
+
+
+model_registry = ModelRegistry()
+
+
+# LOADERS
+def register_spacy_model(name: str = "en_core_web_md") -> str:
+    def load():
+        import spacy
+        return spacy.load(name, exclude=SPACY_UNUSED_COMPONENTS)
+
+    return model_registry.register(f"spacy:{name}", load)
+
+
+def register_sentence_transformer(name: str, backend: str = "torch", quantization: str = None,
+                                  export_dir: str = ONNX_EXPORT_DIR) -> str:
+    """
+    :param backend: "torch" (PyTorch) or "onnx" (ONNX Runtime, exported on first load)
+    :param quantization: dynamic int8 quantization config for the ONNX backend,
+                         e.g. "avx2", "avx512" or "avx512_vnni" (None keeps fp32)
+    :param export_dir: directory the ONNX export is saved to and reused from
+    """
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend} (expected one of {ENCODER_BACKENDS})")
+    if quantization and backend != "onnx":
+        raise ValueError("Quantization is only supported with the onnx backend")
+
+    def load():
+        from sentence_transformers import SentenceTransformer
+        if backend == "torch":
+            return SentenceTransformer(name)
+        return load_onnx_sentence_transformer(name, quantization, export_dir)
+
+    key = f"sentence_transformer:{name}"
+    if backend != "torch":
+        key += f":{backend}" + (f":qint8_{quantization}" if quantization else "")
+    return model_registry.register(key, load)
+
+
+def load_onnx_sentence_transformer(name: str, quantization: str = None, export_dir: str = ONNX_EXPORT_DIR):
+    """
+    Exports the model to ONNX once (optionally with dynamic int8 quantization) and loads
+    it with ONNX Runtime. Later loads reuse the export in export_dir.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model_dir = os.path.join(export_dir, name.replace("/", "__"))
+    file_name = f"onnx/model_qint8_{quantization}.onnx" if quantization else "onnx/model.onnx"
+
+    if not os.path.exists(os.path.join(model_dir, file_name)):
+        model = SentenceTransformer(name, backend="onnx")
+        model.save(model_dir)
+        if quantization:
+            export_dynamic_quantized_onnx_model(model, quantization, model_dir)
+        print(f"Exported ONNX model: {os.path.join(model_dir, file_name)}")
+
+    return SentenceTransformer(model_dir, backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def register_nltk_corpus(name: str) -> str:
+    """
+    NLTK corpora are looked up locally and only downloaded when missing, on first use.
+    """
+    def load():
+        import nltk
+        try:
+            nltk.data.find(f"corpora/{name}")
+        except LookupError:
+            nltk.download(name, quiet=True)
+            print(f"Downloaded NLTK corpus: {name}")
+        return name
+
+    return model_registry.register(f"nltk:{name}", load)
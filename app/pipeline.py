@@ -1,121 +1,636 @@
-import os
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
 from app.extract import Extractor
 from app.tf_idf_preprocess import SimpleResumePreprocessor as TFIDFPreprocessor
-from app.tf_idf_matcher import TFIDFMatcher
 from app.bert_preprocess import BertPreprocessor
 from app.bert_matcher import BertRanker as BERTMatcher
 from app.section_extractor import ResumeSectionExtractorFuzzy
 from app.keyword_matcher import KeywordMatcher
+from app.resume_cache import ResumeCache
+from app.resume_index import ResumeIndex
+from app.tf_idf_matcher import TFIDFMatcher
+from app.ingest import ResumeIngestor
+from app.metrics import metrics
+from app.ranking import top_k_order
+from app.text_normalizer import NormalizedDocument
 
+# Bump when extraction or preprocessing changes so stale cache entries are ignored
+FEATURES_VERSION = "6"
 
-class ResumePipeline:
-    def __init__(self):
-        self.extractor = Extractor()
-        self.section_extractor = ResumeSectionExtractorFuzzy(threshold=80)
-        self.tfidf_preprocessor = TFIDFPreprocessor()
-        self.tfidf_matcher = TFIDFMatcher()
-        self.bert_preprocessor = BertPreprocessor()
-        self.bert_matcher = BERTMatcher(self.bert_preprocessor)
-        self.keyword_matcher = KeywordMatcher()
 
-        # Store processed resumes
-        self.resume_texts = []
-        self.resume_names = []
+# progress(stage, done, total), e.g. progress("extraction", 12, 200)
+ProgressCallback = Callable[[str, int, int], None]
 
-    # Preprocess resumes once
-    def load_resumes(self, resume_files):
-        self.resume_texts, self.resume_names = self.get_processed_resumes(resume_files)
+# on_resume(position, features, error) as soon as a resume's features (without BERT) are ready or it failed
+ResumeCallback = Callable[[int, Optional[Dict], Optional[str]], None]
 
-    # Section extraction helper
-    def get_processed_resumes(self, resume_files):
-        resume_texts = []
-        resume_names = []
 
-        for file in resume_files:
-            sections = self.section_extractor.extract_sections_from_file(file)
-            important_sections = sections["important_sections"]
-            processed = " ".join(important_sections.values())
-            resume_texts.append(processed)
-            resume_names.append(os.path.basename(file))
+def no_progress(stage: str, done: int, total: int):
+    pass
 
-        return resume_texts, resume_names
 
-    # TF-IDF Ranking
-    def rank_resumes_tfidf(self, job_description: str):
-        if not self.resume_texts:
-            raise ValueError("Resumes not loaded. Call load_resumes() first.")
+def normalize_scores(scores) -> np.ndarray:
+    """
+    Scale scores so the best resume gets 1.0 (left unchanged if the best score is not positive).
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if scores.size and scores.max() > 0:
+        return scores / scores.max()
+    return scores
 
-        jd_processed = self.tfidf_preprocessor.process_text(job_description)
-        self.tfidf_matcher.fit(self.resume_texts, self.resume_names)
-        ranked_results = self.tfidf_matcher.rank_resumes(jd_processed)
 
-        if ranked_results and ranked_results[0][1] > 0:
-            max_score = ranked_results[0][1]
-            ranked_results = [(name, score / max_score) for name, score in ranked_results]
+def normalize_score_rows(scores) -> np.ndarray:
+    """
+    normalize_scores() applied to every row of a matrix, e.g. one row per job description.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    row_max = scores.max(axis=1, keepdims=True) if scores.size else np.zeros((len(scores), 1))
+    return np.divide(scores, row_max, out=scores.copy(), where=row_max > 0)
 
-        return ranked_results
 
-    # BERT Ranking
-    def rank_resumes_bert(self, job_description: str):
-        if not self.resume_texts:
-            raise ValueError("Resumes not loaded. Call load_resumes() first.")
+def rank_by_score(names, scores, top_k: int = None, offset: int = 0, components: Dict[str, np.ndarray] = None):
+    """
+    [(name, score), ...] sorted descending; ties keep index order.
+    :param top_k: only return this many entries, starting after the best `offset` ones (partial selection)
+    :param components: optional per-ranker scores aligned with scores; each entry then becomes
+                       (name, score, {ranker: score}) for the returned rows only
+    """
+    order = top_k_order(scores, top_k, offset)
+    if components is None:
+        return [(names[i], float(scores[i])) for i in order]
+    return [
+        (names[i], float(scores[i]), {ranker: float(values[i]) for ranker, values in components.items()})
+        for i in order
+    ]
 
-        bert_results = self.bert_matcher.rank_resumes(job_description, self.resume_texts)
-        name_score_list = []
-        for resume_text, score in bert_results:
-            idx = self.resume_texts.index(resume_text)
-            name_score_list.append((self.resume_names[idx], score))
 
-        if name_score_list and name_score_list[0][1] > 0:
-            max_score = name_score_list[0][1]
-            name_score_list = [(name, score / max_score) for name, score in name_score_list]
+class ResumePipeline:
+    """
+    Shared, read-only model resources (extractors, preprocessors, rankers, cache).
 
-        return name_score_list
+    The pipeline holds no per-request state: resumes live in a ResumeIndex
+    candidate set built by build_index() and passed to every ranking method,
+    so one pipeline (and one copy of each model) can serve concurrent requests
+    from multiple threads.
+    """
 
-    # Keyword Ranking
-    def rank_resumes_keyword(self, job_description: str, jd_skills):
-        if not self.resume_texts:
-            raise ValueError("Resumes not loaded. Call load_resumes() first.")
+    def __init__(self, cache_dir: str = "cache", cache_max_bytes: int = 512 * 1024 * 1024,
+                 ingest_workers: int = None, ingest_timeout: float = 60.0,
+                 bert_backend: str = "torch", bert_quantization: str = None, extraction_limits: Dict = None):
+        """
+        :param cache_dir: directory for the persistent resume feature cache (None disables caching)
+        :param cache_max_bytes: size bound of the resume cache before LRU eviction
+        :param ingest_workers: extraction worker processes per batch (None = one per core, 0 = in-process)
+        :param ingest_timeout: seconds a single file may spend in extraction
+        :param bert_backend: BERT encoder backend, "torch" or "onnx"
+        :param bert_quantization: dynamic int8 quantization config for the onnx backend (None keeps fp32)
+        :param extraction_limits: per-file Extractor limits (max_pages, max_chars, max_seconds, max_file_bytes)
+        """
+        self.extractor = Extractor(**(extraction_limits or {}))
+        self.section_extractor = ResumeSectionExtractorFuzzy(threshold=80, extractor=self.extractor)
+        self.ingestor = ResumeIngestor(
+            max_workers=ingest_workers, timeout=ingest_timeout,
+            threshold=self.section_extractor.threshold,
+            important_sections=self.section_extractor.important_sections,
+            extraction_limits=self.extractor.limits
+        )
+        self.tfidf_preprocessor = TFIDFPreprocessor()
+        self.bert_preprocessor = BertPreprocessor()
+        self.bert_matcher = BERTMatcher(self.bert_preprocessor, backend=bert_backend, quantization=bert_quantization)
+        self.keyword_matcher = KeywordMatcher()
 
-        ranked_results = self.keyword_matcher.rank_resumes(
-            self.resume_texts, self.resume_names, job_description, jd_skills
+        self.cache = None
+        if cache_dir:
+            # Embeddings differ slightly between backends, so each backend gets its own cache entries;
+            # page and size limits change the extracted text, so they are part of the version too
+            version = (
+                f"{FEATURES_VERSION}:{self.section_extractor.threshold}:{self.bert_matcher.model_key}"
+                f":{self.extractor.max_pages}:{self.extractor.max_chars}"
+            )
+            self.cache = ResumeCache(cache_dir, max_bytes=cache_max_bytes, version=version)
+
+    # Preprocess resumes once into a candidate set (per request), or add them to an existing one (e.g. the persistent pool)
+    def build_index(self, resume_files, index: ResumeIndex = None, progress: ProgressCallback = None,
+                    on_resume: ResumeCallback = None) -> Tuple[ResumeIndex, Dict[str, str]]:
+        """
+        Files that fail extraction are left out of the index and reported in the returned errors.
+        :param progress: optional callback(stage, done, total) for the "extraction" and "bert" stages
+        :param on_resume: optional callback(position, features, error) per resume, see get_resume_features()
+        :return: (candidate index, {file name: error})
+        """
+        index = index if index is not None else ResumeIndex()
+        features, errors = self.get_resume_features(resume_files, progress, on_resume)
+
+        names = [self.extractor.file_name(file) for file in resume_files]
+        index.add(
+            [name for name, f in zip(names, features) if f is not None],
+            [f for f in features if f is not None]
         )
+        return index, {names[i]: error for i, error in errors.items()}
+
+    # Per-resume features, served from the cache when the same file was seen before
+    def get_resume_features(self, resume_files, progress: ProgressCallback = None, on_resume: ResumeCallback = None,
+                            encode_bert: bool = True):
+        """
+        :param resume_files: file paths or in-memory ResumeFile objects
+        :param progress: optional callback(stage, done, total)
+        :param on_resume: optional callback(position, features, error) per resume, before BERT encoding;
+                          cached resumes are reported first and already carry their "bert_embedding"
+        :param encode_bert: False leaves uncached resumes without "bert_embedding", to be encoded
+                            (and cached) later with encode_resume_features()
+        :return: (features aligned with resume_files, None where processing failed; {position: error})
+        """
+        progress = progress or no_progress
+        on_resume = on_resume or (lambda i, features, error: None)
+        all_features = [None] * len(resume_files)
+        keys = [None] * len(resume_files)
+        missing = []
+        errors = {}
+
+        for i, file in enumerate(resume_files):
+            # Oversized files are rejected before they are read, hashed or sent to a worker
+            try:
+                self.extractor.check_file_size(file)
+            except (OSError, ValueError) as e:
+                errors[i] = f"{type(e).__name__}: {e}"
+                on_resume(i, None, errors[i])
+                continue
+            if self.cache is not None:
+                content = self.extractor.read_bytes(file)
+                metrics.observe_size("bytes", len(content))
+                with metrics.timer("cache.get"):
+                    keys[i] = self.cache.make_key(content)
+                    all_features[i] = self.cache.get(keys[i])
+            if all_features[i] is None:
+                missing.append(i)
+            else:
+                on_resume(i, all_features[i], None)
+
+        # Extract and sectionize every uncached file concurrently
+        extracted = [len(resume_files) - len(missing)]
+        progress("extraction", extracted[0], len(resume_files))
+
+        def on_extracted(position, result):
+            # Features are computed while the remaining files are still being extracted
+            i = missing[position]
+            if result.ok:
+                all_features[i] = self.compute_resume_features(result.sections)
+                # Text cut short by the time limit is not reproducible, so it is never cached
+                if not result.timed_out:
+                    all_features[i]["cache_key"] = keys[i]
+            else:
+                errors[i] = result.error
+            extracted[0] += 1
+            progress("extraction", extracted[0], len(resume_files))
+            on_resume(i, all_features[i], errors.get(i))
+
+        with metrics.timer("ingest"):
+            self.ingestor.ingest([resume_files[i] for i in missing], on_done=on_extracted)
+
+        if encode_bert:
+            self.encode_resume_features(all_features, progress)
+        return all_features, errors
+
+    def encode_resume_features(self, features: List[Optional[Dict]], progress: ProgressCallback = None) -> int:
+        """
+        Encode every resume in features that has no BERT embedding yet in one batched pass,
+        then store it in the cache.
+        :return: number of resumes encoded
+        """
+        progress = progress or no_progress
+        pending = [f for f in features if f is not None and "bert_text" in f]
+        progress("bert", 0, len(pending))
+        embeddings = self.bert_matcher.encode_resumes([f.pop("bert_text") for f in pending], cleaned=True)
+        progress("bert", len(pending), len(pending))
+        for feature, embedding in zip(pending, embeddings):
+            feature["bert_embedding"] = embedding
+            key = feature.pop("cache_key", None)
+            if key is not None:
+                with metrics.timer("cache.put"):
+                    self.cache.put(key, feature)
+        return len(pending)
+
+    def compute_resume_features(self, important_sections: Dict[str, str]):
+        """
+        Everything except the BERT embedding, which is computed in batch by get_resume_features().
+        All rankers' inputs come from one shared normalization pass over the text;
+        "bert_text" is only kept until the embedding is computed.
+        """
+        processed = " ".join(important_sections.values())
+        metrics.observe_size("chars", len(processed))
+
+        with metrics.timer("normalization"):
+            doc = NormalizedDocument(processed)
+            features = {
+                "sections": important_sections,
+                "text": processed,
+                "tfidf_text": doc.tfidf_text,
+                "keywords": doc.keywords,
+                "skills": self.keyword_matcher.extract_skills(doc.lower),
+                "bert_text": doc.bert_text,
+            }
+            keyword_text = doc.keyword_text
+        with metrics.timer("keyword.vector"):
+            features["spacy_vector"] = self.keyword_matcher.text_vector(keyword_text)
+        return features
+
+    # CANDIDATE RETRIEVAL (first stage of two-stage ranking for large pools)
+    def retrieve_candidates(self, candidates: ResumeIndex, job_description: str, top_n: int,
+                            jd_embedding: np.ndarray = None) -> np.ndarray:
+        """
+        Union of the top_n resumes by TF-IDF (inverted-index lookup over the JD terms) and the
+        top_n by BERT embedding (approximate nearest-neighbour search).
+        :return: sorted row positions in candidates
+        """
+        self._require_candidates(candidates)
+        jd_processed = self.tfidf_preprocessor.process_text(job_description)
+        tfidf_rows = candidates.tfidf_matcher.top_candidates(jd_processed, top_n)
+        if jd_embedding is None:
+            jd_embedding = self.bert_matcher.encode_job_description(job_description)
+        bert_rows, _ = candidates.ann.search(jd_embedding, top_n)
+        return np.union1d(tfidf_rows, bert_rows).astype(np.int64)
 
-        if ranked_results:
-            max_score = max(score for _, score in ranked_results)
-            if max_score > 0:
-                ranked_results = [(name, score / max_score) for name, score in ranked_results]
+    # TF-IDF Ranking
+    def score_resumes_tfidf(self, candidates: ResumeIndex, job_description: str, rows: np.ndarray = None) -> np.ndarray:
+        """
+        :param rows: optional row positions to score (all candidates if None)
+        """
+        self._require_candidates(candidates)
+        jd_processed = self.tfidf_preprocessor.process_text(job_description)
+        scores = candidates.tfidf_matcher.scores(jd_processed)
+        return normalize_scores(scores if rows is None else scores[rows])
 
-        return ranked_results
+    def rank_resumes_tfidf(self, candidates: ResumeIndex, job_description: str, top_k: int = None, offset: int = 0):
+        return rank_by_score(candidates.names, self.score_resumes_tfidf(candidates, job_description), top_k, offset)
 
-    # Hybrid Ranking (TF-IDF + BERT + Keywords)
-    def rank_resumes_hybrid(self, job_description: str, jd_skills, weights=(0.4, 0.4, 0.2)):
-        if not self.resume_texts:
-            raise ValueError("Resumes not loaded. Call load_resumes() first.")
+    # BERT Ranking
+    def score_resumes_bert(self, candidates: ResumeIndex, job_description: str, rows: np.ndarray = None,
+                           jd_embedding: np.ndarray = None) -> np.ndarray:
+        self._require_candidates(candidates)
+        embeddings = candidates.bert_embeddings if rows is None else candidates.bert_embeddings[rows]
+        return normalize_scores(self.bert_matcher.score_embeddings(job_description, embeddings, jd_embedding))
 
-        tfidf_results = dict(self.rank_resumes_tfidf(job_description))
-        bert_results = dict(self.rank_resumes_bert(job_description))
-        keyword_results = dict(self.rank_resumes_keyword(job_description, jd_skills))
+    def rank_resumes_bert(self, candidates: ResumeIndex, job_description: str, top_k: int = None, offset: int = 0):
+        return rank_by_score(candidates.names, self.score_resumes_bert(candidates, job_description), top_k, offset)
 
-        tfidf_w, bert_w, keyword_w = weights
-        hybrid_scores = {}
+    # Keyword Ranking
+    def score_resumes_keyword(self, candidates: ResumeIndex, job_description: str, jd_skills,
+                              rows: np.ndarray = None) -> np.ndarray:
+        self._require_candidates(candidates)
+        texts, vectors, keywords, skills = candidates.texts, candidates.spacy_vectors, candidates.keywords, candidates.skills
+        if rows is not None:
+            texts = texts.take(rows)
+            vectors = vectors[rows]
+            keywords = keywords.take(rows)
+            skills = skills.take(rows)
+        scores = self.keyword_matcher.score_resumes(
+            texts, job_description, jd_skills,
+            resume_vectors=vectors,
+            resume_keywords=keywords,
+            resume_skills=skills
+        )
+        return normalize_scores(scores)
 
-        for name in self.resume_names:
-            tfidf_score = tfidf_results.get(name, 0)
-            bert_score = bert_results.get(name, 0)
-            keyword_score = keyword_results.get(name, 0)
+    def rank_resumes_keyword(self, candidates: ResumeIndex, job_description: str, jd_skills,
+                             top_k: int = None, offset: int = 0):
+        scores = self.score_resumes_keyword(candidates, job_description, jd_skills)
+        return rank_by_score(candidates.names, scores, top_k, offset)
 
-            final_score = (
-                tfidf_w * tfidf_score +
-                bert_w * bert_score +
-                keyword_w * keyword_score
+    # Hybrid Ranking (TF-IDF + BERT + Keywords)
+    def score_resumes_hybrid(self, candidates: ResumeIndex, job_description: str, jd_skills, weights=(0.4, 0.4, 0.2),
+                             progress: ProgressCallback = None, rows: np.ndarray = None,
+                             jd_embedding: np.ndarray = None) -> np.ndarray:
+        """
+        Weighted sum of the normalized ranker scores (0-100), aligned with candidates.names
+        (or with rows, if given).
+        :param progress: optional callback(stage, done, total) for the "tfidf", "bert" and "keyword" stages
+        :param rows: optional row positions to score, e.g. from retrieve_candidates()
+        """
+        components = self.score_resumes_components(candidates, job_description, jd_skills, progress, rows, jd_embedding)
+        return self.combine_scores(components, weights)
+
+    @staticmethod
+    def combine_scores(components: Dict[str, np.ndarray], weights=(0.4, 0.4, 0.2)) -> np.ndarray:
+        tfidf_w, bert_w, keyword_w = weights
+        hybrid_scores = (
+            tfidf_w * components["tfidf"] +
+            bert_w * components["bert"] +
+            keyword_w * components["keyword"]
+        )
+        return hybrid_scores * 100
+
+    def score_resumes_components(self, candidates: ResumeIndex, job_description: str, jd_skills,
+                                 progress: ProgressCallback = None, rows: np.ndarray = None,
+                                 jd_embedding: np.ndarray = None) -> Dict[str, np.ndarray]:
+        """
+        Normalized (0-1) score of each ranker: {"tfidf": ..., "bert": ..., "keyword": ...}.
+        """
+        progress = progress or no_progress
+        n = len(candidates) if rows is None else len(rows)
+
+        progress("tfidf", 0, n)
+        tfidf_scores = self.score_resumes_tfidf(candidates, job_description, rows)
+        progress("tfidf", n, n)
+
+        progress("bert", 0, n)
+        bert_scores = self.score_resumes_bert(candidates, job_description, rows, jd_embedding)
+        progress("bert", n, n)
+
+        progress("keyword", 0, n)
+        keyword_scores = self.score_resumes_keyword(candidates, job_description, jd_skills, rows)
+        progress("keyword", n, n)
+
+        return {"tfidf": tfidf_scores, "bert": bert_scores, "keyword": keyword_scores}
+
+    def rank_resumes_hybrid(self, candidates: ResumeIndex, job_description: str, jd_skills, weights=(0.4, 0.4, 0.2),
+                            progress: ProgressCallback = None, retrieve_top_n: int = None,
+                            top_k: int = None, offset: int = 0, breakdown: bool = False, explain: bool = False):
+        """
+        :param retrieve_top_n: two-stage mode for large pools: only the union of the top N resumes by
+                               TF-IDF and by BERT nearest-neighbour search is fully scored and returned
+                               (None, or a pool no larger than N, scores every candidate)
+        :param top_k: only return this many resumes, starting after the best `offset` ones
+        :param breakdown: return (name, score, {ranker: normalized score}) for each returned resume
+        :param explain: return (name, score, {ranker: normalized score}, explanation) for each
+                        returned resume, see explain_resumes()
+        """
+        rows = None
+        jd_embedding = None
+        if retrieve_top_n is not None and len(candidates) > retrieve_top_n:
+            jd_embedding = self.bert_matcher.encode_job_description(job_description)
+            rows = self.retrieve_candidates(candidates, job_description, retrieve_top_n, jd_embedding)
+
+        components = self.score_resumes_components(candidates, job_description, jd_skills, progress, rows, jd_embedding)
+        scores = self.combine_scores(components, weights)
+        return self.rank_page(candidates, job_description, jd_skills, scores, components, rows,
+                              top_k, offset, breakdown, explain, jd_embedding)
+
+    def rank_page(self, candidates: ResumeIndex, job_description: str, jd_skills, scores: np.ndarray,
+                  components: Dict[str, np.ndarray], rows: np.ndarray = None, top_k: int = None, offset: int = 0,
+                  breakdown: bool = False, explain: bool = False, jd_embedding: np.ndarray = None):
+        """
+        rank_by_score() of hybrid scores, with explanations of the returned resumes only if explain is set.
+        :param rows: row positions in candidates that scores and components are aligned with (all if None)
+        """
+        names = candidates.names if rows is None else [candidates.names[i] for i in rows]
+        if not explain:
+            return rank_by_score(names, scores, top_k, offset, components if breakdown else None)
+
+        order = top_k_order(scores, top_k, offset)
+        explanations = self.explain_resumes(
+            candidates, job_description, jd_skills, order if rows is None else rows[order], jd_embedding
+        )
+        return [
+            (names[i], float(scores[i]), {ranker: float(values[i]) for ranker, values in components.items()}, explanation)
+            for i, explanation in zip(order, explanations)
+        ]
+
+    def explain_resumes(self, candidates: ResumeIndex, job_description: str, jd_skills, rows: np.ndarray,
+                        jd_embedding: np.ndarray = None, n_terms: int = 5) -> List[Dict]:
+        """
+        Why each resume at the given rows scored as it did, from the data the rankers already hold:
+        - "tfidf_terms": the JD n-grams adding most to its TF-IDF cosine, as (term, contribution)
+        - "matched_skills" / "missing_skills": the JD skills it has and lacks (normalized names)
+        - "best_chunk": (text, cosine) of its BERT chunk closest to the JD (None without text)
+        Meant for one page of results: the cost grows with len(rows), not with the pool.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return []
+
+        with metrics.timer("explain"):
+            jd_processed = self.tfidf_preprocessor.process_text(job_description)
+            terms = candidates.tfidf_matcher.term_contributions(jd_processed, rows, n_terms)
+
+            skill_matcher = self.keyword_matcher.skill_matcher
+            compiled_skills = skill_matcher.compile_jd_skills(jd_skills)
+            texts = candidates.texts.take(rows)
+            skills = candidates.skills.take(rows)
+
+            if jd_embedding is None:
+                jd_embedding = self.bert_matcher.encode_job_description(job_description)
+            # Same cleaned text the embeddings were computed from, so its chunks hit the chunk cache
+            best_chunks = self.bert_matcher.best_chunks(
+                [NormalizedDocument(text).bert_text for text in texts], jd_embedding, cleaned=True
             )
 
-            hybrid_scores[name] = final_score * 100
-
-        # Sort descending
-        ranked = sorted(hybrid_scores.items(), key=lambda x: x[1], reverse=True)
-        return ranked
+            explanations = []
+            for i in range(len(rows)):
+                matched = skill_matcher.matched_skills(skills[i], texts[i], compiled_skills)
+                explanations.append({
+                    "tfidf_terms": terms[i],
+                    "matched_skills": matched,
+                    "missing_skills": [skill.name for skill in compiled_skills if skill.name not in matched],
+                    "best_chunk": best_chunks[i],
+                })
+        return explanations
+
+    # Bulk Hybrid Ranking (many job descriptions against one candidate set)
+    def score_resumes_hybrid_many(self, candidates: ResumeIndex, jobs: List[Tuple[str, List[str]]],
+                                  weights=(0.4, 0.4, 0.2), progress: ProgressCallback = None) -> np.ndarray:
+        """
+        score_resumes_hybrid() for every (job description, jd_skills) pair in jobs: all JDs are
+        encoded in one BERT batch, transformed in one TF-IDF pass, and each ranker scores the
+        whole JD x resume matrix at once.
+        :return: matrix of shape (len(jobs), len(candidates)), one row of 0-100 scores per job
+        """
+        self._require_candidates(candidates)
+        progress = progress or no_progress
+        tfidf_w, bert_w, keyword_w = weights
+        job_descriptions = [jd for jd, _ in jobs]
+        n = len(jobs)
+
+        progress("tfidf", 0, n)
+        jd_processed = [self.tfidf_preprocessor.process_text(jd) for jd in job_descriptions]
+        tfidf_scores = normalize_score_rows(candidates.tfidf_matcher.scores_many(jd_processed))
+        progress("tfidf", n, n)
+
+        progress("bert", 0, n)
+        jd_embeddings = self.bert_matcher.encode_job_descriptions(job_descriptions)
+        bert_scores = normalize_score_rows(
+            self.bert_matcher.score_embeddings_many(jd_embeddings, candidates.bert_embeddings)
+        )
+        progress("bert", n, n)
+
+        progress("keyword", 0, n)
+        keyword_scores = normalize_score_rows(self.keyword_matcher.score_resumes_many(
+            candidates.texts, jobs,
+            resume_vectors=candidates.spacy_vectors,
+            resume_keywords=candidates.keywords,
+            resume_skills=candidates.skills
+        ))
+        progress("keyword", n, n)
+
+        hybrid_scores = (
+            tfidf_w * tfidf_scores +
+            bert_w * bert_scores +
+            keyword_w * keyword_scores
+        )
+        return hybrid_scores * 100
+
+    def rank_resumes_hybrid_many(self, candidates: ResumeIndex, jobs: List[Tuple[str, List[str]]],
+                                 weights=(0.4, 0.4, 0.2), progress: ProgressCallback = None,
+                                 top_k: int = None, offset: int = 0):
+        """
+        :param top_k: only return this many resumes per job, starting after the best `offset` ones
+        :return: one ranking per job, in the order of jobs
+        """
+        scores = self.score_resumes_hybrid_many(candidates, jobs, weights, progress)
+        return [rank_by_score(candidates.names, row, top_k, offset) for row in scores]
+
+    # Cascade Hybrid Ranking (BERT-encode only the resumes that can still reach the top-k)
+    def rank_resumes_cascade(self, resume_files, job_description: str, jd_skills, top_k: int, weights=(0.4, 0.4, 0.2),
+                             batch_size: int = 32, progress: ProgressCallback = None, offset: int = 0,
+                             breakdown: bool = False, explain: bool = False):
+        """
+        Top-k hybrid ranking of uploaded files that skips BERT encoding for resumes that cannot make the top-k.
+
+        TF-IDF and keyword scores are cheap and computed for every resume first. Uncached resumes are then
+        encoded in batches, best TF-IDF + keyword score first, until no unencoded resume could beat the k-th
+        best encoded one even with a perfect BERT score, so the best offset + top_k resumes of
+        rank_resumes_hybrid() over all files are always among the encoded ones.
+
+        The result is not the exact top-k of rank_resumes_hybrid(): BERT scores are normalized by the best
+        encoded resume, so when a skipped resume has a higher raw BERT similarity, every encoded resume's
+        score, and possibly their order, differs from the full ranking. It is only equal when nothing is
+        skipped. Use it where cutting BERT work matters more than matching the full ranking.
+        :param batch_size: resumes encoded per step
+        :param offset: return the top_k resumes after the best `offset` ones (the cascade then keeps offset + top_k)
+        :param breakdown: return (name, score, {ranker: normalized score}) for each returned resume
+        :param explain: also add each returned resume's explain_resumes() entry
+        :return: (top-k ranking, {file name: error}, {"total", "encoded", "skipped"})
+        """
+        if top_k <= 0:
+            raise ValueError("top_k must be positive")
+        progress = progress or no_progress
+        tfidf_w, bert_w, keyword_w = weights
+        keep = offset + top_k
+
+        features, errors = self.get_resume_features(resume_files, progress, encode_bert=False)
+        names = [self.extractor.file_name(file) for file in resume_files]
+        error_names = {names[i]: error for i, error in errors.items()}
+        latest = {name: f for name, f in zip(names, features) if f is not None}
+        if not latest:
+            return [], error_names, {"total": 0, "encoded": 0, "skipped": 0}
+
+        # Uncached resumes get a zero placeholder embedding until they are encoded
+        dim = self.bert_matcher.model.get_sentence_embedding_dimension()
+        candidates = ResumeIndex()
+        candidates.add(list(latest), [
+            f if "bert_embedding" in f else dict(f, bert_embedding=np.zeros(dim, dtype=np.float32))
+            for f in latest.values()
+        ])
+        pending = [latest[name] for name in candidates.names]
+        n = len(candidates)
+
+        progress("tfidf", 0, n)
+        tfidf_scores = self.score_resumes_tfidf(candidates, job_description)
+        progress("tfidf", n, n)
+        progress("keyword", 0, n)
+        keyword_scores = self.score_resumes_keyword(candidates, job_description, jd_skills)
+        progress("keyword", n, n)
+        cheap_scores = tfidf_w * tfidf_scores + keyword_w * keyword_scores
+
+        jd_embedding = self.bert_matcher.encode_job_description(job_description)
+        encoded = np.array(["bert_text" not in f for f in pending], dtype=bool)
+        bert_raw = np.zeros(n)
+        bert_raw[encoded] = self.bert_matcher.score_embeddings(
+            job_description, candidates.bert_embeddings[encoded], jd_embedding
+        )
+        newly_encoded = 0
+
+        while not encoded.all():
+            if encoded.sum() >= keep:
+                # Cosine scores are at most 1, so normalized BERT scores never exceed 1 and a
+                # non-negative raw score never shrinks when normalized
+                bert_max = bert_raw[encoded].max()
+                bert_lower = np.where(bert_raw >= 0, bert_raw, bert_raw / bert_max if bert_max > 0 else -np.inf)
+                kth_lower = np.partition((cheap_scores + bert_w * bert_lower)[encoded], -keep)[-keep]
+                if (cheap_scores[~encoded] + bert_w).max() < kth_lower:
+                    break
+
+            unencoded = np.flatnonzero(~encoded)
+            batch = unencoded[np.argsort(-cheap_scores[unencoded], kind="stable")[:batch_size]]
+            newly_encoded += self.encode_resume_features([pending[i] for i in batch])
+            for i in batch:
+                candidates.bert_embeddings[i] = pending[i]["bert_embedding"]
+            bert_raw[batch] = self.bert_matcher.score_embeddings(
+                job_description, candidates.bert_embeddings[batch], jd_embedding
+            )
+            encoded[batch] = True
+            progress("bert", int(encoded.sum()), n)
+
+        rows = np.flatnonzero(encoded)
+        components = {
+            "tfidf": tfidf_scores[rows],
+            "bert": normalize_scores(bert_raw[rows]),
+            "keyword": keyword_scores[rows],
+        }
+        scores = self.combine_scores(components, weights)
+        ranked = self.rank_page(candidates, job_description, jd_skills, scores, components, rows,
+                                top_k, offset, breakdown, explain, jd_embedding)
+        return ranked, error_names, {"total": n, "encoded": newly_encoded, "skipped": n - len(rows)}
+
+    # Streaming Hybrid Ranking (results reported while the batch is still processing)
+    def rank_resumes_streaming(self, resume_files, job_description: str, jd_skills, emit: Callable[[Dict], None],
+                               weights=(0.4, 0.4, 0.2)) -> Tuple[List[Tuple[str, float]], Dict[str, str]]:
+        """
+        Ranks uploaded files like build_index() + rank_resumes_hybrid(), emitting events on the way:
+        - {"event": "partial", ...} per resume as soon as it is extracted, scored with keyword matching
+          and term-frequency similarity to the job description (no corpus statistics needed yet)
+        - {"event": "error", ...} per resume that could not be processed
+        - {"event": "refined", ...} per resume once the batch's BERT embeddings are computed
+        Scores in these events are provisional (0-100, not normalized across the batch).
+        :return: (authoritative ranking, {file name: error})
+        """
+        tfidf_w, bert_w, keyword_w = weights
+        names = [self.extractor.file_name(file) for file in resume_files]
+        total = len(resume_files)
+
+        tfidf_matcher = TFIDFMatcher()
+        jd_terms = tfidf_matcher.term_frequencies(self.tfidf_preprocessor.process_text(job_description))
+        skill_vectors = self.keyword_matcher.get_skill_vectors(jd_skills)
+        partial = {}
+        done = [0]
+
+        def on_resume(i, features, error):
+            done[0] += 1
+            if error is not None:
+                emit({"event": "error", "name": names[i], "error": error, "done": done[0], "total": total})
+                return
+            scores = {
+                "tfidf": tfidf_matcher.term_frequency_cosine(jd_terms, tfidf_matcher.term_frequencies(features["tfidf_text"])),
+                "keyword": float(self.keyword_matcher.score_resumes(
+                    [features["text"]], job_description, jd_skills,
+                    resume_vectors=[features["spacy_vector"]],
+                    resume_keywords=[features["keywords"]],
+                    resume_skills=[features["skills"]],
+                    skill_vectors=skill_vectors
+                )[0]),
+            }
+            partial[names[i]] = scores
+            cheap_w = tfidf_w + keyword_w
+            score = 100 * (tfidf_w * scores["tfidf"] + keyword_w * scores["keyword"]) / cheap_w if cheap_w else 0.0
+            emit({"event": "partial", "name": names[i], "score": score, "scores": scores, "done": done[0], "total": total})
+
+        candidates, errors = self.build_index(resume_files, on_resume=on_resume)
+        if not len(candidates):
+            return [], errors
+
+        jd_embedding = self.bert_matcher.encode_job_description(job_description)
+        bert_scores = self.bert_matcher.score_embeddings(job_description, candidates.bert_embeddings, jd_embedding)
+        for n, (name, bert_score) in enumerate(zip(candidates.names, bert_scores.tolist()), start=1):
+            scores = dict(partial[name], bert=bert_score)
+            score = 100 * (tfidf_w * scores["tfidf"] + bert_w * scores["bert"] + keyword_w * scores["keyword"])
+            emit({"event": "refined", "name": name, "score": score, "scores": scores, "done": n, "total": len(candidates)})
+
+        scores = self.score_resumes_hybrid(candidates, job_description, jd_skills, weights, jd_embedding=jd_embedding)
+        return rank_by_score(candidates.names, scores), errors
+
+    @staticmethod
+    def _require_candidates(candidates: ResumeIndex):
+        if candidates is None or not len(candidates):
+            raise ValueError("No resumes loaded. Build a candidate index with build_index() first.")
 
 
 if __name__ == "__main__":
@@ -135,24 +650,26 @@ if __name__ == "__main__":
     jd_skills = ["Python", "Machine Learning", "Deep Learning", "Flask", "NLP"]
 
     pipeline = ResumePipeline()
-    pipeline.load_resumes(sample_resumes)  # load once
+    candidates, errors = pipeline.build_index(sample_resumes)  # load once
+    for name, error in errors.items():
+        print(f"Skipped {name}: {error}")
 
     print("=== TF-IDF Ranking ===")
-    tfidf_results = pipeline.rank_resumes_tfidf(sample_jd)
+    tfidf_results = pipeline.rank_resumes_tfidf(candidates, sample_jd)
     for name, score in tfidf_results:
         print(f"{name}: {score:.3f}")
 
     print("\n=== BERT Ranking ===")
-    bert_results = pipeline.rank_resumes_bert(sample_jd)
+    bert_results = pipeline.rank_resumes_bert(candidates, sample_jd)
     for name, score in bert_results:
         print(f"{name}: {score:.3f}")
 
     print("\n=== Keyword Ranking ===")
-    keyword_results = pipeline.rank_resumes_keyword(sample_jd, jd_skills)
+    keyword_results = pipeline.rank_resumes_keyword(candidates, sample_jd, jd_skills)
     for name, score in keyword_results:
         print(f"{name}: {score:.3f}")
 
     print("\n=== HYBRID Ranking (TF-IDF + BERT + Keyword) ===")
-    hybrid_results = pipeline.rank_resumes_hybrid(sample_jd, jd_skills)
+    hybrid_results = pipeline.rank_resumes_hybrid(candidates, sample_jd, jd_skills)
     for name, score in hybrid_results:
         print(f"{name}: {score:.3f}")
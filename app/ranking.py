@@ -0,0 +1,33 @@
+from typing import Optional
+
+import numpy as np
+
+
+def top_k_order(scores, top_k: Optional[int] = None, offset: int = 0) -> np.ndarray:
+    """
+    Row positions of one page of the ranking, best first; ties keep index order.
+    Only the best offset + top_k scores are selected (argpartition) and sorted,
+    so the work scales with the page rather than the number of rows.
+    :param top_k: page size (None returns every row from offset on)
+    :param offset: number of best rows skipped
+    """
+    scores = np.asarray(scores)
+    if offset < 0 or (top_k is not None and top_k < 0):
+        raise ValueError("top_k and offset must not be negative")
+
+    n = len(scores)
+    end = n if top_k is None else min(n, offset + top_k)
+    if end <= offset:
+        return np.zeros(0, dtype=np.int64)
+
+    if end < n:
+        # Everything strictly above the end-th best score, plus the first rows tied with it
+        threshold = -np.partition(-scores, end - 1)[end - 1]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:end - len(above)]
+        selected = np.concatenate([above, tied])
+    else:
+        selected = np.arange(n)
+
+    order = selected[np.lexsort((selected, -scores[selected]))]
+    return order[offset:end]
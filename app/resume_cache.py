@@ -0,0 +1,140 @@
+import hashlib
+import os
+import pickle
+import threading
+from typing import Any, Dict, Optional
+
+# Eviction frees space down to this fraction of max_bytes, so the following writes
+# do not each trigger another scan of the whole cache directory
+EVICT_TO_FRACTION = 0.9
+
+
+class ResumeCache:
+    """
+    On-disk, content-addressed cache of per-resume features.
+
+    Entries are keyed by the SHA-256 of the file bytes combined with a version
+    tag (extractor / model versions), so re-uploading the same resume skips
+    extraction, preprocessing and embedding. Total size on disk is bounded and
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(self, cache_dir: str = "cache", max_bytes: int = 512 * 1024 * 1024, version: str = ""):
+        """
+        :param cache_dir: directory where cache entries are stored
+        :param max_bytes: upper bound on total size of cached entries
+        :param version: tag mixed into every key; change it to invalidate old entries
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    # KEYS
+    def make_key(self, content: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".pkl")
+
+    def _entries(self):
+        """
+        Yields (path, last_used, size) for every entry on disk.
+        """
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    # LOOKUP / STORE
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except Exception:
+            # Truncated, corrupt or written by incompatible code: drop it and treat as a miss
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Write to a temp file first so readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes -= size
+
+    def _evict(self):
+        """
+        Removes least recently used entries until the cache fits in EVICT_TO_FRACTION of max_bytes.
+        Must be called with the lock held.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self._total_bytes = sum(size for _, _, size in entries)
+        target = self.max_bytes * EVICT_TO_FRACTION
+        for path, _, size in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._total_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = 0
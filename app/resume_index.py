@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+from app.ann_index import EmbeddingANNIndex
+from app.compact_store import EMBEDDING_DTYPE, TextStore, TokenSets, save_array, save_json
+from app.skill_matcher import get_skill_matcher
+from app.tf_idf_matcher import TFIDFMatcher
+
+
+class ResumeIndex:
+    """
+    Long-lived candidate index holding everything the rankers need per resume:
+    - incremental TF-IDF term counts / document frequencies (TFIDFMatcher)
+    - BERT resume embedding matrix (float16)
+    - spaCy resume vector matrix (float16)
+    - keyword sets and taxonomy skill sets as interned token ids (TokenSets)
+    - processed texts (TextStore, memory-mapped from disk after save() or load())
+    - an approximate nearest-neighbour index over the BERT embeddings (built on first use)
+
+    Everything is stored column-wise, with no Python object per resume besides its name.
+    Resumes can be added and removed without refitting, and the index can be
+    saved to disk and memory-mapped back at startup.
+    """
+
+    def __init__(self):
+        self.tfidf_matcher = TFIDFMatcher(keep_texts=False)
+        self.names: List[str] = []
+        self.texts = TextStore()
+        self.keywords = TokenSets()
+        self.skills = TokenSets()
+        self.bert_embeddings = None
+        self.spacy_vectors = None
+        self._ann = None
+        self._ann_path = None
+        # Rankings may run concurrently, so the lazily built ANN index is built once under a lock
+        self._ann_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def ann(self) -> EmbeddingANNIndex:
+        if self._ann is None:
+            with self._ann_lock:
+                if self._ann is None:
+                    ann = EmbeddingANNIndex()
+                    if self._ann_path is not None:
+                        ann.load(self._ann_path, self._as_array(self.bert_embeddings))
+                    else:
+                        ann.build(self._as_array(self.bert_embeddings))
+                    self._ann = ann
+        return self._ann
+
+    # INCREMENTAL UPDATES
+    def add(self, names: List[str], features: List[Dict]):
+        """
+        Add resumes from their pipeline features. A name already in the index is replaced.
+        :param names: resume names (usually file names)
+        :param features: per-resume feature dicts produced by ResumePipeline.get_resume_features()
+        """
+        if not names:
+            return
+
+        # Last occurrence wins, both against the index and within the batch
+        latest = {name: i for i, name in enumerate(names)}
+        names = [name for i, name in enumerate(names) if latest[name] == i]
+        features = [features[latest[name]] for name in names]
+        existing = set(self.names)
+        self.remove([name for name in names if name in existing])
+
+        self.tfidf_matcher.add_processed([f["tfidf_text"] for f in features], names)
+        self.names.extend(names)
+        self.texts.extend(f["text"] for f in features)
+        self.keywords.extend(f["keywords"] for f in features)
+        self.skills.extend(f["skills"] for f in features)
+        new_embeddings = np.asarray([f["bert_embedding"] for f in features], dtype=np.float32)
+        self.bert_embeddings = self._append_rows(self.bert_embeddings, new_embeddings)
+        self.spacy_vectors = self._append_rows(self.spacy_vectors, [f["spacy_vector"] for f in features])
+        if self._ann is not None:
+            self._ann.add(new_embeddings)
+
+    def remove(self, names: List[str]):
+        to_remove = set(names)
+        keep = np.array([name not in to_remove for name in self.names], dtype=bool)
+        if keep.all():
+            return
+
+        self.tfidf_matcher.remove(list(to_remove))
+        self.names = [n for n, k in zip(self.names, keep) if k]
+        self.texts.keep_rows(keep)
+        self.keywords = self.keywords.take(keep)
+        self.skills = self.skills.take(keep)
+        self.bert_embeddings = self.bert_embeddings[keep]
+        self.spacy_vectors = self.spacy_vectors[keep]
+        # Row ids shift, so the ANN index is rebuilt on next use
+        self._ann = None
+        self._ann_path = None
+
+    @staticmethod
+    def _append_rows(matrix, rows):
+        rows = np.asarray(rows, dtype=EMBEDDING_DTYPE)
+        if matrix is None or len(matrix) == 0:
+            return rows
+        return np.vstack([matrix, rows])
+
+    # PERSISTENCE
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.tfidf_matcher.save(path)
+        save_array(os.path.join(path, "bert_embeddings.npy"), self._as_array(self.bert_embeddings))
+        save_array(os.path.join(path, "spacy_vectors.npy"), self._as_array(self.spacy_vectors))
+        self.texts.save(path, "texts")
+        self.keywords.save(path, "keywords")
+        self.skills.save(path, "skills")
+        graph_path = os.path.join(path, "bert_hnsw.bin")
+        if self._ann is not None:
+            self._ann.save(graph_path, self._as_array(self.bert_embeddings))
+        elif not EmbeddingANNIndex.saved_for(graph_path, self._as_array(self.bert_embeddings)):
+            # A graph left by an earlier save no longer matches the embeddings
+            EmbeddingANNIndex.remove_saved(graph_path)
+        save_json(os.path.join(path, "index_meta.json"), {"names": self.names})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ResumeIndex":
+        """
+        Load an index written by save(). Large arrays (and the texts) are memory-mapped
+        read-only; later add/remove calls build new arrays instead of writing to the files.
+        Indexes saved with texts and token sets in index_meta.json are still readable.
+        """
+        mmap_mode = "r" if mmap else None
+        index = cls()
+        index.tfidf_matcher = TFIDFMatcher.load(path, mmap=mmap, keep_texts=False)
+        with open(os.path.join(path, "index_meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index.names = meta["names"]
+        if "texts" in meta:
+            # Index saved before the columnar layout
+            index.texts = TextStore.from_texts(meta["texts"])
+            index.keywords = TokenSets.from_sets(meta["keywords"])
+            if "skills" in meta:
+                index.skills = TokenSets.from_sets(meta["skills"])
+            else:
+                # Index saved before skill extraction existed
+                index.skills = TokenSets.from_sets(get_skill_matcher().find_skills(text) for text in index.texts)
+        else:
+            index.texts = TextStore.load(path, "texts", mmap=mmap)
+            index.keywords = TokenSets.load(path, "keywords", mmap=mmap)
+            index.skills = TokenSets.load(path, "skills", mmap=mmap)
+        index.bert_embeddings = np.load(os.path.join(path, "bert_embeddings.npy"), mmap_mode=mmap_mode)
+        index.spacy_vectors = np.load(os.path.join(path, "spacy_vectors.npy"), mmap_mode=mmap_mode)
+        index._ann_path = os.path.join(path, "bert_hnsw.bin")
+        return index
+
+    @staticmethod
+    def _as_array(matrix):
+        return matrix if matrix is not None else np.zeros((0, 0), dtype=EMBEDDING_DTYPE)
+
+
+class ReadWriteLock:
+    """
+    Lets any number of readers (rankings) use a ResumeIndex at once, while a writer
+    (add/remove/save) gets it alone. Waiting writers go first, so a steady stream of
+    rankings cannot hold off updates indefinitely.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
@@ -1,6 +1,8 @@
 from typing import Dict
+import numpy as np
 from rapidfuzz import fuzz, process
 from app.extract import Extractor
+from app.metrics import timed
 import re
 
 class ResumeSectionExtractorFuzzy:
@@ -72,16 +74,30 @@ class ResumeSectionExtractorFuzzy:
         "programming skills": "skills",
     }
 
-    def __init__(self, threshold: int = 80, important_sections=None):
+    def __init__(self, threshold: int = 80, important_sections=None, extractor: Extractor = None):
         """
         :param threshold: Minimum fuzzy match score to consider a line as a section header
         :param important_sections: List of canonical section names considered important
+        :param extractor: text extractor for files (default extraction limits if None)
         """
         self.threshold = threshold
-        self.extractor = Extractor()
+        self.extractor = extractor or Extractor()
         # Default important sections
         self.important_sections = important_sections or ["projects", "certifications", "publications", "skills", "experience"]
 
+        # Header matcher, built once per instance
+        self._header_choices = [h.lower() for h in self.SECTION_HEADERS_MAPPING.keys()]
+        self._header_sections = [self.SECTION_HEADERS_MAPPING[h] for h in self._header_choices]
+
+        # fuzz.ratio = 200 * LCS / (len(a) + len(b)) <= 200 * min(len) / (len(a) + len(b)),
+        # so lines much shorter or longer than every header can never reach the threshold
+        header_lengths = [len(h) for h in self._header_choices]
+        if 0 < threshold < 200:
+            self._min_header_line = min(header_lengths) * threshold / (200 - threshold)
+            self._max_header_line = max(header_lengths) * (200 - threshold) / threshold
+        else:
+            self._min_header_line, self._max_header_line = 0, float("inf")
+
     def preprocess_text(self, text: str) -> str:
         """
         Clean text to remove page breaks, multiple newlines, and normalize hyphens.
@@ -98,45 +114,70 @@ class ResumeSectionExtractorFuzzy:
         Returns a dict:
         {
             "all_sections": {...},
-            "important_sections": {...}
+            "important_sections": {...},
+            "timed_out": whether the extractor's time limit cut the text short
         }
         """
-        raw_text = self.extractor.extract_text_from_file(resume_file)
+        raw_text, timed_out = self.extractor.extract_text(resume_file)
         all_sections = self.extract_sections(raw_text)
 
         important_sections = {k: v for k, v in all_sections.items() if k in self.important_sections}
 
         return {
             "all_sections": all_sections,
-            "important_sections": important_sections
+            "important_sections": important_sections,
+            "timed_out": timed_out
         }
 
+    def match_headers(self, lines) -> Dict[int, str]:
+        """
+        Fuzzy match lines against the known headers in one batched cdist call.
+        Only lines whose length allows a score above the threshold are scored.
+        Returns {line index: canonical section name} for lines that are headers.
+        """
+        candidates = []
+        for i, line in enumerate(lines):
+            line_lower = line.lower()
+            if self._min_header_line <= len(line_lower) <= self._max_header_line:
+                candidates.append((i, line_lower))
+
+        if not candidates:
+            return {}
+
+        scores = process.cdist(
+            [line_lower for _, line_lower in candidates],
+            self._header_choices,
+            scorer=fuzz.ratio,
+            dtype=np.float64
+        )
+        # argmax picks the first best header, like process.extractOne
+        best = scores.argmax(axis=1)
+
+        headers = {}
+        for row, (i, _) in enumerate(candidates):
+            if scores[row, best[row]] >= self.threshold:
+                headers[i] = self._header_sections[best[row]]
+        return headers
+
+    @timed("sectioning")
     def extract_sections(self, text: str) -> Dict[str, str]:
         """
         Divide resume text into sections based on fuzzy-matched headers.
         Returns a dictionary: {canonical_section_name: section_text}
         """
         text = self.preprocess_text(text)
-        lines = text.splitlines()
+        lines = [line.strip() for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        headers = self.match_headers(lines)
+
         sections = {}
         current_section = "other"
         buffer = []
 
-        for line in lines:
-            line_clean = line.strip()
-            if not line_clean:
-                continue
-
-            # Fuzzy match against headers
-            best_match = process.extractOne(
-                line_clean.lower(),
-                [h.lower() for h in self.SECTION_HEADERS_MAPPING.keys()],
-                scorer=fuzz.ratio
-            )
-
-            if best_match and best_match[1] >= self.threshold:
-                matched_header = self.SECTION_HEADERS_MAPPING[best_match[0].lower()]
+        for i, line_clean in enumerate(lines):
+            matched_header = headers.get(i)
 
+            if matched_header is not None:
                 if buffer:
                     sections[current_section] = " ".join(buffer)
                     buffer = []
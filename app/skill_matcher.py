@@ -0,0 +1,282 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static_base")
+
+# Skill tokens keep trailing "+"/"#" (c++, c#); any other character separates tokens,
+# so "CI/CD", "ci-cd" and "ci cd" all normalize to the phrase "ci cd"
+SKILL_TOKEN_RE = re.compile(r"[a-z0-9]+[+#]*")
+
+# Aliases that are common words or abbreviations of unrelated things in resumes ("cv" is
+# the resume itself, "lead" a verb). They are recognized when a JD uses them, but a resume
+# mentioning them does not count as having the skill they abbreviate.
+AMBIGUOUS_ALIASES = {"cv", "ci", "db", "go", "lead", "org", "comm", "pm", "po", "pt", "np", "pd", "tf", "ts",
+                     "rs", "kt", "rb", "ng"}
+
+# Taxonomy skills that are also single letters or everyday words ("R&D", "appendix c", "we go live").
+# A resume only has them when the mention has context: a neighbouring skill of the same group
+# ("C/C++", "Python, R, SQL") or a following word such as "language" ("Go developer").
+AMBIGUOUS_SKILLS = {"c", "r", "go"}
+SKILL_CONTEXT_WORDS = {"language", "lang", "programming", "programmer", "developer", "development"}
+# A character right after the token makes it part of a non-skill word ("R&D", "go-live", "C-suite")
+NON_SKILL_JOINERS = ("&", "-")
+# Neighbouring skills separated by one of these are in different sentences, not in one list
+SENTENCE_BREAKS = ".!?"
+
+
+def skill_tokens(text: str) -> List[str]:
+    return SKILL_TOKEN_RE.findall(text.lower())
+
+
+def normalize_skill(phrase: str) -> str:
+    return " ".join(skill_tokens(phrase))
+
+
+def incidence_matrix(rows: List[Iterable[int]], n_cols: int) -> csr_matrix:
+    """
+    Sparse 0/1 matrix with a 1 at every (row, column) listed in rows.
+    """
+    indptr = [0]
+    indices = []
+    for cols in rows:
+        indices.extend(set(cols))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return csr_matrix((data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+                      shape=(len(rows), n_cols))
+
+
+def set_incidence(sets, columns: Dict[str, int]) -> csr_matrix:
+    """
+    incidence_matrix() of string sets over the given columns; members outside columns are ignored.
+    :param sets: list of sets, or a TokenSets store (mapped without building Python sets)
+    """
+    if hasattr(sets, "incidence"):
+        return sets.incidence(columns)
+    return incidence_matrix([[columns[s] for s in members if s in columns] for members in sets], len(columns))
+
+
+def segment_fractions(matches: np.ndarray, lengths: List[int]) -> np.ndarray:
+    """
+    :param matches: boolean matrix whose rows are consecutive groups of the given lengths
+    :return: per group, the fraction of its rows matched in each column (0 for empty groups)
+    """
+    totals = np.zeros((len(matches) + 1, matches.shape[1]))
+    np.cumsum(matches, axis=0, out=totals[1:])
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    sums = totals[offsets[1:]] - totals[offsets[:-1]]
+    lengths = np.asarray(lengths, dtype=np.float64)[:, None]
+    return np.divide(sums, lengths, out=np.zeros_like(sums), where=lengths > 0)
+
+
+class JDSkill:
+    """
+    A JD skill compiled for matching: the taxonomy phrases that satisfy it, or a
+    phrase pattern searched in the resume text if it is not in the taxonomy.
+    """
+
+    def __init__(self, name: str, accepted: Set[str], pattern: Optional[re.Pattern] = None):
+        self.name = name
+        self.accepted = accepted
+        self.pattern = pattern
+
+
+class SkillMatcher:
+    """
+    Finds every skill of the static_base taxonomy (skills.json, plus the aliases and
+    canonical names of synonyms.json) in a text with one left-to-right pass over a
+    token trie, always taking the longest phrase at each position.
+
+    find_skills() results depend only on the resume, so they are computed once per
+    resume and matched against any number of JDs with skill_overlap().
+    """
+
+    def __init__(self, static_dir: str = STATIC_DIR):
+        with open(os.path.join(static_dir, "skills.json"), "r", encoding="utf-8") as f:
+            groups = json.load(f)
+        skills = [skill for group in groups.values() for skill in group]
+        # phrase -> skills.json group, used to vouch for ambiguous skills listed next to related ones
+        self.groups: Dict[str, str] = {normalize_skill(s): group for group, members in groups.items() for s in members}
+        with open(os.path.join(static_dir, "synonyms.json"), "r", encoding="utf-8") as f:
+            synonyms = json.load(f)
+        with open(os.path.join(static_dir, "stopwords.json"), "r", encoding="utf-8") as f:
+            stopwords = json.load(f)
+
+        # alias -> canonical name, and canonical name -> aliases resumes may use for it
+        self.canonical: Dict[str, str] = {}
+        self.aliases: Dict[str, Set[str]] = {}
+        for alias, canonical in synonyms.items():
+            alias, canonical = normalize_skill(alias), normalize_skill(canonical)
+            if alias and canonical:
+                self.canonical[alias] = canonical
+                if alias not in AMBIGUOUS_ALIASES:
+                    self.aliases.setdefault(canonical, set()).add(alias)
+                group = self.groups.get(canonical) or self.groups.get(alias)
+                if group:
+                    self.groups.setdefault(alias, group)
+                    self.groups.setdefault(canonical, group)
+
+        self.stopwords = {tuple(skill_tokens(w)) for w in stopwords if skill_tokens(w)}
+        self.phrases = {normalize_skill(s) for s in skills} | set(self.canonical) | set(self.canonical.values())
+        self.phrases = {p for p in self.phrases if p and tuple(p.split()) not in self.stopwords}
+
+        self._trie = self._build_trie(self.phrases)
+        self._stopword_trie = self._build_trie(" ".join(w) for w in self.stopwords)
+
+    @staticmethod
+    def _build_trie(phrases: Iterable[str]) -> Dict:
+        # Nested dicts keyed by token; the None key marks the end of a phrase
+        trie = {}
+        for phrase in phrases:
+            node = trie
+            for token in phrase.split():
+                node = node.setdefault(token, {})
+            node[None] = phrase
+        return trie
+
+    @staticmethod
+    def _longest_match(trie: Dict, tokens: List[str], start: int) -> Tuple[Optional[str], int]:
+        node, match, end = trie, None, start
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if None in node:
+                match, end = node[None], i + 1
+        return match, end
+
+    # RESUME SIDE
+    def find_skills(self, text: str) -> Set[str]:
+        """
+        :return: normalized taxonomy phrases mentioned in the text (as written, not canonicalized)
+        """
+        lower_text = text.lower()
+        spans = list(SKILL_TOKEN_RE.finditer(lower_text))
+        tokens = [span.group() for span in spans]
+        # (phrase, first token, end token) of every match, left to right
+        matches = []
+        i = 0
+        while i < len(tokens):
+            match, end = self._longest_match(self._trie, tokens, i)
+            if match is None:
+                i += 1
+            else:
+                matches.append((match, i, end))
+                i = end
+        return {
+            phrase for k, (phrase, _, _) in enumerate(matches)
+            if phrase not in AMBIGUOUS_SKILLS or self._has_context(lower_text, spans, matches, k)
+        }
+
+    def _has_context(self, lower_text: str, spans: List[re.Match], matches: List[Tuple[str, int, int]], k: int) -> bool:
+        """
+        Whether the k-th match (an AMBIGUOUS_SKILLS phrase) is used as a skill rather than a letter or word.
+        """
+        phrase, start, end = matches[k]
+        after = spans[end - 1].end()
+        if lower_text[after:after + 1] in NON_SKILL_JOINERS:
+            return False
+        if end < len(spans) and spans[end].group() in SKILL_CONTEXT_WORDS:
+            return True
+
+        group = self.groups.get(phrase)
+        neighbours = []
+        if k > 0 and matches[k - 1][2] == start:
+            neighbours.append((matches[k - 1][0], lower_text[spans[start - 1].end():spans[start].start()]))
+        if k + 1 < len(matches) and matches[k + 1][1] == end:
+            neighbours.append((matches[k + 1][0], lower_text[after:spans[end].start()]))
+        return any(
+            neighbour not in AMBIGUOUS_SKILLS and self.groups.get(neighbour) == group
+            and not any(c in SENTENCE_BREAKS for c in gap)
+            for neighbour, gap in neighbours
+        )
+
+    # JD SIDE
+    def strip_stopwords(self, phrase: str) -> str:
+        tokens = skill_tokens(phrase)
+        kept = []
+        i = 0
+        while i < len(tokens):
+            match, end = self._longest_match(self._stopword_trie, tokens, i)
+            if match is None:
+                kept.append(tokens[i])
+                i += 1
+            else:
+                i = end
+        return " ".join(kept)
+
+    def compile_jd_skills(self, jd_skills: List[str]) -> List[JDSkill]:
+        compiled = []
+        seen = set()
+        for skill in jd_skills:
+            name = self.strip_stopwords(skill)
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            canonical = self.canonical.get(name, name)
+            accepted = {name, canonical} | self.aliases.get(name, set()) | self.aliases.get(canonical, set())
+            accepted &= self.phrases
+
+            pattern = None
+            if not accepted:
+                # Not in the taxonomy: match the phrase itself, with any separators between its tokens
+                separator = r"[^a-z0-9+#]+"
+                pattern = re.compile(
+                    r"(?<![a-z0-9+#])" + separator.join(re.escape(t) for t in name.split()) + r"(?![a-z0-9+#])"
+                )
+            compiled.append(JDSkill(name, accepted, pattern))
+        return compiled
+
+    @staticmethod
+    def matched_skills(resume_skills: Set[str], resume_text: str, jd_skills: List[JDSkill]) -> List[str]:
+        lower_text = None
+        matched = []
+        for skill in jd_skills:
+            if skill.pattern is None:
+                if skill.accepted & resume_skills:
+                    matched.append(skill.name)
+            else:
+                lower_text = lower_text if lower_text is not None else resume_text.lower()
+                if skill.pattern.search(lower_text):
+                    matched.append(skill.name)
+        return matched
+
+    def skill_overlap(self, resume_skills: Set[str], resume_text: str, jd_skills: List[JDSkill]) -> float:
+        """
+        Fraction of the JD skills the resume has (0–1).
+        """
+        if not jd_skills:
+            return 0.0
+        return len(self.matched_skills(resume_skills, resume_text, jd_skills)) / len(jd_skills)
+
+    def skill_overlap_matrix(self, resume_skills: List[Set[str]], resume_texts: List[str],
+                             jd_skill_lists: List[List[JDSkill]]) -> np.ndarray:
+        """
+        skill_overlap() of every (JD, resume) pair: taxonomy skills of all JDs are matched
+        against all resumes in one sparse product.
+        :return: matrix of shape (len(jd_skill_lists), len(resume_texts))
+        """
+        flat = [skill for skills in jd_skill_lists for skill in skills]
+        columns = {}
+        accepted_cols = [[columns.setdefault(phrase, len(columns)) for phrase in skill.accepted] for skill in flat]
+        accepted = incidence_matrix(accepted_cols, len(columns))
+        resumes = set_incidence(resume_skills, columns)
+        matches = (accepted @ resumes.T).toarray() > 0
+
+        lower_texts = None
+        for j, skill in enumerate(flat):
+            if skill.pattern is not None:
+                lower_texts = lower_texts if lower_texts is not None else [text.lower() for text in resume_texts]
+                matches[j] = [skill.pattern.search(text) is not None for text in lower_texts]
+        return segment_fractions(matches, [len(skills) for skills in jd_skill_lists])
+
+
+@lru_cache(maxsize=1)
+def get_skill_matcher() -> SkillMatcher:
+    return SkillMatcher()
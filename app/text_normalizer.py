@@ -0,0 +1,114 @@
+import re
+from functools import cached_property, lru_cache
+from typing import List
+
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from app.models import model_registry, register_nltk_corpus
+
+# Corpora are checked (and downloaded if missing) on first use, never at import
+required_corpora = [register_nltk_corpus(corpus) for corpus in ['stopwords', 'wordnet', 'omw-1.4']]
+
+RESUME_STOPWORDS = {
+    'resume', 'cv', 'curriculum', 'vitae', 'profile', 'summary',
+    'objective', 'references', 'available', 'upon', 'request'
+}
+
+URL_RE = re.compile(r'https?://\S+')
+NON_ALPHA_RE = re.compile(r'[^a-z\s]')
+WHITESPACE_RE = re.compile(r'\s+')
+ALPHA_WORD_RE = re.compile(r'[a-z]+')
+KEYWORD_RE = re.compile(r'[a-zA-Z0-9_#+]+')
+NON_BERT_RE = re.compile(r'[^a-z0-9\s.,]')
+
+
+@lru_cache(maxsize=1)
+def get_lemmatizer() -> WordNetLemmatizer:
+    for corpus in required_corpora:
+        model_registry.get(corpus)
+    return WordNetLemmatizer()
+
+
+@lru_cache(maxsize=1)
+def get_stop_words() -> frozenset:
+    for corpus in required_corpora:
+        model_registry.get(corpus)
+    return frozenset(stopwords.words('english'))
+
+
+@lru_cache(maxsize=1)
+def get_resume_stop_words() -> frozenset:
+    return get_stop_words().union(RESUME_STOPWORDS)
+
+
+@lru_cache(maxsize=200_000)
+def lemmatize(word: str) -> str:
+    """
+    WordNet lemma of a word, memoized across all documents and rankers.
+    """
+    return get_lemmatizer().lemmatize(word)
+
+
+# NORMALIZATION STEPS (shared by the rankers' preprocessors)
+def tfidf_tokens(lower_text: str) -> List[str]:
+    text = URL_RE.sub('', lower_text)                    # Remove URLs
+    text = NON_ALPHA_RE.sub('', text)                    # Remove special characters
+    stop_words = get_resume_stop_words()
+    return [lemmatize(t) for t in text.split() if t not in stop_words and len(t) > 2]
+
+
+def keyword_tokens(lower_text: str) -> List[str]:
+    stop_words = get_stop_words()
+    return [lemmatize(w) for w in ALPHA_WORD_RE.findall(lower_text) if w not in stop_words]
+
+
+def keyword_set(lower_text: str) -> set:
+    return set(KEYWORD_RE.findall(lower_text))
+
+
+def bert_clean(lower_text: str) -> str:
+    text = WHITESPACE_RE.sub(' ', lower_text)
+    text = NON_BERT_RE.sub('', text)
+    return text.strip()
+
+
+class NormalizedDocument:
+    """
+    All normalized views of one resume, produced from a single lowercasing pass
+    and computed at most once each:
+    - tfidf_text: lemmatized tokens for TFIDFMatcher
+    - keyword_text: lemmatized words for KeywordMatcher's spaCy vectors
+    - keywords: exact-match keyword set for KeywordMatcher
+    - bert_text: cleaned text for BertRanker
+    """
+
+    def __init__(self, text: str):
+        self.text = text if isinstance(text, str) else ""
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def tfidf_tokens(self) -> List[str]:
+        return tfidf_tokens(self.lower)
+
+    @cached_property
+    def tfidf_text(self) -> str:
+        return " ".join(self.tfidf_tokens)
+
+    @cached_property
+    def keyword_tokens(self) -> List[str]:
+        return keyword_tokens(self.lower)
+
+    @cached_property
+    def keyword_text(self) -> str:
+        return " ".join(self.keyword_tokens)
+
+    @cached_property
+    def keywords(self) -> set:
+        return keyword_set(self.lower)
+
+    @cached_property
+    def bert_text(self) -> str:
+        return bert_clean(self.lower)
@@ -1,45 +1,328 @@
+import json
+import os
+import threading
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import List
+from app.compact_store import TermVocabulary, save_array, save_json
+from app.metrics import timed
+from app.ranking import top_k_order
 from app.tf_idf_preprocess import SimpleResumePreprocessor as TFIDFPreprocessor
 
+# Texts whose term counts are collected before their terms are looked up in the vocabulary together
+COUNT_BATCH_TEXTS = 256
+
+# remove() drops terms no remaining resume uses once they are this fraction of the vocabulary
+PRUNE_UNUSED_TERMS_FRACTION = 0.25
+
+
 class TFIDFMatcher:
-    def __init__(self):
-        # TF-IDF vectorizer
+    """
+    TF-IDF matcher that keeps raw term counts and document frequencies, so resumes
+    can be added and removed incrementally and any job description can be ranked
+    without refitting. Scores are identical to refitting TfidfVectorizer (smooth idf,
+    l2 norm) on the current resume set.
+    """
+
+    def __init__(self, keep_texts: bool = True):
+        """
+        :param keep_texts: keep the processed resume texts in resume_texts (a ResumeIndex
+                           stores its own texts and only needs the term counts)
+        """
+        self.keep_texts = keep_texts
+        # TF-IDF vectorizer (only its analyzer is used, vocabulary is maintained here)
         self.vectorizer = TfidfVectorizer(stop_words='english', lowercase=True, ngram_range=(1,3))
-        self.tfidf_matrix = None
+        self.analyzer = self.vectorizer.build_analyzer()
+        self.vocabulary = TermVocabulary()
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.term_counts = None
         self.resume_texts = []
         self.resume_names = []
         self.preprocessor = TFIDFPreprocessor()
 
+        # Derived from term_counts, rebuilt lazily after add/remove; built under a lock
+        # because concurrent rankings may need them at the same time
+        self._counts_csc = None
+        self._row_norms = None
+        self._derived_lock = threading.Lock()
+
     def fit(self, raw_resume_texts: List[str], resume_names: List[str] = None):
         """
         Preprocess raw resume texts, fit TF-IDF, and store names.
         :param raw_resume_texts: list of raw resume texts (extracted by pipeline)
         :param resume_names: optional list of resume filenames
         """
-        self.resume_texts = [self.preprocessor.process_text(text) for text in raw_resume_texts]
-        self.resume_names = resume_names if resume_names else [f"Resume {i}" for i in range(len(raw_resume_texts))]
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.resume_texts)
+        processed_texts = [self.preprocessor.process_text(text) for text in raw_resume_texts]
+        self.fit_processed(processed_texts, resume_names)
+
+    def fit_processed(self, processed_resume_texts: List[str], resume_names: List[str] = None):
+        """
+        Fit TF-IDF on resume texts already run through the TF-IDF preprocessor
+        (e.g. loaded from the resume cache).
+        """
+        self.vocabulary = TermVocabulary()
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.term_counts = None
+        self.resume_texts = []
+        self.resume_names = []
+        self.add_processed(processed_resume_texts, resume_names)
+
+    # INCREMENTAL UPDATES
+    @timed("tfidf.index")
+    def add_processed(self, processed_resume_texts: List[str], resume_names: List[str] = None):
+        """
+        Add preprocessed resumes without refitting the existing ones.
+        """
+        start = len(self.resume_names)
+        resume_names = resume_names if resume_names else [f"Resume {i}" for i in range(start, start + len(processed_resume_texts))]
+
+        rows = self._count_terms(processed_resume_texts, grow_vocabulary=True)
+        n_terms = len(self.vocabulary)
+
+        doc_freq = np.zeros(n_terms, dtype=np.int64)
+        doc_freq[:len(self.doc_freq)] = self.doc_freq
+        doc_freq += np.bincount(rows.indices, minlength=n_terms)
+        self.doc_freq = doc_freq
+
+        if self.term_counts is None:
+            self.term_counts = rows
+        else:
+            old = self.term_counts
+            old = csr_matrix((old.data, old.indices, old.indptr), shape=(old.shape[0], n_terms))
+            self.term_counts = vstack([old, rows], format="csr")
+
+        if self.keep_texts:
+            self.resume_texts.extend(processed_resume_texts)
+        self.resume_names.extend(resume_names)
+        self._invalidate()
+
+    def remove(self, resume_names: List[str]):
+        """
+        Remove resumes by name, updating document frequencies in place of a refit.
+        """
+        to_remove = set(resume_names)
+        keep = np.array([name not in to_remove for name in self.resume_names], dtype=bool)
+        if self.term_counts is None or keep.all():
+            return
+
+        removed = self.term_counts[~keep]
+        self.doc_freq = self.doc_freq - np.bincount(removed.indices, minlength=len(self.doc_freq))
+        self.term_counts = self.term_counts[keep]
+        if self.keep_texts:
+            self.resume_texts = [t for t, k in zip(self.resume_texts, keep) if k]
+        self.resume_names = [n for n, k in zip(self.resume_names, keep) if k]
+        if np.count_nonzero(self.doc_freq == 0) > PRUNE_UNUSED_TERMS_FRACTION * len(self.doc_freq):
+            self._prune_terms(self.doc_freq > 0)
+        self._invalidate()
+
+    def _prune_terms(self, keep: np.ndarray):
+        """
+        Drop the vocabulary columns where keep is False (terms with no count in any resume).
+        """
+        columns = (np.cumsum(keep) - 1).astype(np.int32)
+        counts = self.term_counts
+        self.term_counts = csr_matrix(
+            (counts.data, columns[counts.indices], counts.indptr), shape=(counts.shape[0], int(keep.sum()))
+        )
+        self.doc_freq = self.doc_freq[keep]
+        self.vocabulary.keep_columns(keep)
+
+    def _count_terms(self, texts: List[str], grow_vocabulary: bool) -> csr_matrix:
+        indptr = [0]
+        indices = []
+        data = []
+        for start in range(0, len(texts), COUNT_BATCH_TEXTS):
+            counters = [Counter(self.analyzer(text or "")) for text in texts[start:start + COUNT_BATCH_TEXTS]]
+            terms = list({term: None for counter in counters for term in counter})
+            cols = self.vocabulary.lookup(terms)
+            unknown = cols < 0
+            if grow_vocabulary and unknown.any():
+                cols[unknown] = self.vocabulary.extend([terms[i] for i in np.flatnonzero(unknown)])
+            columns = dict(zip(terms, cols.tolist()))
+            for counter in counters:
+                for term, count in counter.items():
+                    col = columns[term]
+                    if col >= 0:
+                        indices.append(col)
+                        data.append(count)
+                indptr.append(len(indices))
+
+        # Counts are small integers, exact in float32 (half the memory of float64)
+        return csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), len(self.vocabulary))
+        )
+
+    def _invalidate(self):
+        self._counts_csc = None
+        self._row_norms = None
+
+    # SCORING
+    def idf(self) -> np.ndarray:
+        n_docs = len(self.resume_names)
+        return np.log((1 + n_docs) / (1 + self.doc_freq)) + 1
+
+    def scores(self, raw_job_description: str) -> np.ndarray:
+        """
+        Cosine similarity of the job description to every resume, aligned with resume_names.
+        Only the columns of terms present in the job description are touched.
+        """
+        return self.scores_many([raw_job_description])[0]
+
+    @timed("tfidf.score")
+    def scores_many(self, raw_job_descriptions: List[str]) -> np.ndarray:
+        """
+        Batched version of scores(): all job descriptions are scored in one sparse product
+        over the union of their terms.
+        :return: matrix of shape (len(raw_job_descriptions), number of resumes)
+        """
+        jd_processed = [self.preprocessor.process_text(jd) for jd in raw_job_descriptions]
+        cols, jd_weights, idf = self._jd_term_weights(jd_processed)
+        jd_norms = np.linalg.norm(jd_weights, axis=1)
+
+        dots = np.asarray((self._counts_csc[:, cols] @ (jd_weights * idf[cols]).T).T)
+        norms = np.outer(jd_norms, self._row_norms)
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+    def term_contributions(self, raw_job_description: str, rows, n_terms: int = 5) -> List[List[Tuple[str, float]]]:
+        """
+        The JD terms (n-grams) adding most to the cosine score of each given resume, with
+        their part of that score. Only the given rows of the term counts are read.
+        :param rows: row positions of the resumes to explain
+        :return: per row, up to n_terms (term, contribution) pairs, largest first
+        """
+        jd_processed = self.preprocessor.process_text(raw_job_description)
+        cols, jd_weights, idf = self._jd_term_weights([jd_processed])
+        rows = np.asarray(rows, dtype=np.int64)
+        jd_terms = list(dict.fromkeys(self.analyzer(jd_processed)))
+        terms = {col: term for term, col in zip(jd_terms, self.vocabulary.lookup(jd_terms).tolist()) if col >= 0}
+
+        counts = self.term_counts[rows][:, cols].toarray()
+        norms = np.linalg.norm(jd_weights[0]) * self._row_norms[rows, None]
+        contributions = np.divide(counts * (jd_weights[0] * idf[cols]), norms,
+                                  out=np.zeros(counts.shape), where=norms > 0)
+
+        explained = []
+        for row in contributions:
+            matched = np.flatnonzero(row > 0)
+            top = matched[np.argsort(-row[matched], kind="stable")[:n_terms]]
+            explained.append([(terms[cols[j]], float(row[j])) for j in top])
+        return explained
+
+    def _jd_term_weights(self, jd_processed: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: (vocabulary columns of the JD terms, TF-IDF weight of each JD on those columns, idf)
+        """
+        if self.term_counts is None:
+            raise ValueError("You must call fit() with resumes before ranking.")
+
+        jd_counts = self._count_terms(jd_processed, grow_vocabulary=False)
+        idf = self.idf()
+
+        # Terms that only occurred in removed resumes are not part of the fitted vocabulary
+        cols = np.unique(jd_counts.indices)
+        cols = cols[self.doc_freq[cols] > 0]
+        jd_weights = jd_counts[:, cols].toarray() * idf[cols]
+
+        if self._counts_csc is None:
+            with self._derived_lock:
+                if self._counts_csc is None:
+                    # Norms first: other threads only check _counts_csc
+                    self._row_norms = self._tfidf_row_norms(idf)
+                    self._counts_csc = self.term_counts.tocsc()
+        return cols, jd_weights, idf
+
+    def top_candidates(self, raw_job_description: str, k: int) -> np.ndarray:
+        """
+        Row positions of the (at most) k best-scoring resumes with a non-zero score, best first.
+        Works as an inverted-index lookup: only resumes sharing a term with the job description can score.
+        """
+        similarities = self.scores(raw_job_description)
+        matched = np.flatnonzero(similarities > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-similarities[matched], k - 1)[:k]]
+        return matched[np.argsort(-similarities[matched], kind="stable")]
+
+    # PROVISIONAL SCORING (no corpus statistics, usable before the resume set is complete)
+    def term_frequencies(self, processed_text: str) -> Counter:
+        return Counter(self.analyzer(processed_text or ""))
+
+    @staticmethod
+    def term_frequency_cosine(jd_terms: Counter, resume_terms: Counter) -> float:
+        """
+        Cosine similarity of raw term counts over the job description's vocabulary.
+        Stands in for the TF-IDF score of a single resume while the rest of the batch is still processing.
+        """
+        dot = sum(count * resume_terms.get(term, 0) for term, count in jd_terms.items())
+        if dot == 0:
+            return 0.0
+        jd_norm = np.sqrt(sum(c * c for c in jd_terms.values()))
+        resume_norm = np.sqrt(sum(c * c for c in resume_terms.values()))
+        return float(dot / (jd_norm * resume_norm))
 
-    def rank_resumes(self, raw_job_description: str, normalize: bool = True):
+    def _tfidf_row_norms(self, idf: np.ndarray) -> np.ndarray:
+        # Works directly on the (possibly memory-mapped, read-only) CSR arrays
+        counts = self.term_counts
+        rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        squared = (counts.data * idf[counts.indices]) ** 2
+        return np.sqrt(np.bincount(rows, weights=squared, minlength=counts.shape[0]))
+
+    def rank_resumes(self, raw_job_description: str, normalize: bool = True, top_k: int = None, offset: int = 0):
         """
         Rank resumes based on TF-IDF similarity to job description.
         :param raw_job_description: raw job description text
         :param normalize: whether to scale scores 0-100
+        :param top_k: only return this many resumes, starting after the best `offset` ones
         :return: list of tuples [(resume_name, score), ...] sorted descending
         """
-        if self.tfidf_matrix is None:
-            raise ValueError("You must call fit() with resumes before ranking.")
+        similarities = self.scores(raw_job_description)
+        return [(self.resume_names[i], float(similarities[i])) for i in top_k_order(similarities, top_k, offset)]
 
-        jd_processed = self.preprocessor.process_text(raw_job_description)
-        jd_vector = self.vectorizer.transform([jd_processed])
-
-        similarities = cosine_similarity(jd_vector, self.tfidf_matrix).flatten()
-        ranked_resumes = list(zip(self.resume_names, similarities))
-        ranked_resumes.sort(key=lambda x: x[1], reverse=True)
+    # PERSISTENCE
+    def save(self, path: str):
+        """
+        Write counts, document frequencies and vocabulary as plain .npy/.bin files
+        so load() can memory-map the large arrays.
+        """
+        os.makedirs(path, exist_ok=True)
+        counts = self.term_counts if self.term_counts is not None else csr_matrix((0, len(self.vocabulary)))
+        save_array(os.path.join(path, "tfidf_data.npy"), counts.data)
+        save_array(os.path.join(path, "tfidf_indices.npy"), counts.indices)
+        save_array(os.path.join(path, "tfidf_indptr.npy"), counts.indptr)
+        save_array(os.path.join(path, "tfidf_doc_freq.npy"), self.doc_freq)
+        self.vocabulary.save(path, "tfidf")
+        save_json(os.path.join(path, "tfidf_meta.json"), {
+            "resume_texts": self.resume_texts,
+            "resume_names": self.resume_names,
+        })
 
-        return ranked_resumes
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, keep_texts: bool = True) -> "TFIDFMatcher":
+        mmap_mode = "r" if mmap else None
+        matcher = cls(keep_texts=keep_texts)
+        with open(os.path.join(path, "tfidf_meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if "vocabulary" in meta:
+            # Saved before the vocabulary was packed: term -> column in tfidf_meta.json
+            matcher.vocabulary = TermVocabulary.from_terms(sorted(meta["vocabulary"], key=meta["vocabulary"].get))
+        else:
+            matcher.vocabulary = TermVocabulary.load(path, "tfidf", mmap=mmap)
+        matcher.resume_texts = meta.get("resume_texts", []) if keep_texts else []
+        matcher.resume_names = meta["resume_names"]
+        matcher.doc_freq = np.load(os.path.join(path, "tfidf_doc_freq.npy"))
+        matcher.term_counts = csr_matrix(
+            (
+                np.load(os.path.join(path, "tfidf_data.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(path, "tfidf_indices.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(path, "tfidf_indptr.npy"), mmap_mode=mmap_mode),
+            ),
+            shape=(len(matcher.resume_names), len(matcher.vocabulary)),
+            copy=False
+        )
+        return matcher
 
 
 
@@ -1,26 +1,11 @@
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-import re
 from typing import List, Optional
+from app.text_normalizer import URL_RE, NON_ALPHA_RE, WHITESPACE_RE, get_resume_stop_words, tfidf_tokens
 
-required_corpora = ['stopwords', 'wordnet', 'omw-1.4']
-for corpus in required_corpora:
-    try:
-        nltk.data.find(f'corpora/{corpus}')
-    except LookupError:
-        nltk.download(corpus)
-        print(f"Downloaded NLTK corpus: {corpus}")
-
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
 
 class SimpleResumePreprocessor:  
-    def __init__(self):
-        self.resume_stopwords = stop_words.union({
-            'resume', 'cv', 'curriculum', 'vitae', 'profile', 'summary',
-            'objective', 'references', 'available', 'upon', 'request'
-        })
+    @property
+    def resume_stopwords(self) -> frozenset:
+        return get_resume_stop_words()
 
     def clean_text(self, text: str) -> str:
         """Perform basic text cleaning"""
@@ -30,26 +15,20 @@ class SimpleResumePreprocessor:
         text = text.lower()
         # text = re.sub(r'\S+@\S+', '', text)            # Remove emails
         # text = re.sub(r'[\d\-\(\)\s]{8,}', '', text)  # Remove phone numbers
-        text = re.sub(r'https?://\S+', '', text)      # Remove URLs
-        text = re.sub(r'[^a-z\s]', '', text)          # Remove special characters
-        text = re.sub(r'\s+', ' ', text).strip()      # Remove extra spaces
+        text = URL_RE.sub('', text)                   # Remove URLs
+        text = NON_ALPHA_RE.sub('', text)             # Remove special characters
+        text = WHITESPACE_RE.sub(' ', text).strip()   # Remove extra spaces
 
         return text
 
     def tokenize_and_lemmatize(self, text: str) -> List[str]:
-        tokens = text.split()
-        processed_tokens = [
-            lemmatizer.lemmatize(token)
-            for token in tokens
-            if token not in self.resume_stopwords and len(token) > 2
-        ]
-        return processed_tokens
+        return tfidf_tokens(text)
 
     def process_text(self, text: str) -> Optional[str]:
         try:
-            cleaned_text = self.clean_text(text)
-            processed_tokens = self.tokenize_and_lemmatize(cleaned_text)
-            return ' '.join(processed_tokens)
+            if not isinstance(text, str):
+                return ""
+            return ' '.join(tfidf_tokens(text.lower()))
         except Exception as e:
             print(f"An error occurred during processing: {e}")
             return None
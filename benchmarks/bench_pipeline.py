@@ -0,0 +1,207 @@
+"""
+Per-stage latency, throughput and memory benchmark of ResumePipeline on synthetic resumes.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline --sizes 10,100,1000 --output bench.json
+    python -m benchmarks.bench_pipeline --sizes 10,100 --baseline bench.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from app.models import model_registry
+from app.pipeline import ResumePipeline
+from app.resume_index import ResumeIndex
+from benchmarks.synthetic_resumes import FORMATS, SyntheticResumeGenerator
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+# Pools larger than this are also ranked in two-stage (retrieval + rescoring) mode
+TWO_STAGE_TOP_N = 500
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class StageTimer:
+    """
+    Runs pipeline stages and records one result row per (stage, batch size).
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        :param trace_memory: also record the peak Python/numpy allocation of each stage
+                             (tracemalloc slows the stage down, so latencies are less accurate)
+        """
+        self.trace_memory = trace_memory
+        self.results: List[Dict[str, Any]] = []
+
+    def run(self, stage: str, batch_size: int, func: Callable[[], Any]) -> Any:
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func()
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            if self.trace_memory:
+                tracemalloc.stop()
+
+        row = {
+            "stage": stage,
+            "batch_size": batch_size,
+            "seconds": seconds,
+            "per_item_ms": 1000 * seconds / batch_size if batch_size else None,
+            "items_per_second": batch_size / seconds if seconds > 0 else None,
+            "max_rss_mb": max_rss_mb(),
+        }
+        if peak is not None:
+            row["peak_traced_mb"] = peak / (1024 * 1024)
+        self.results.append(row)
+        print(f"{stage:>20} n={batch_size:<6} {seconds:9.3f}s  {row['per_item_ms'] or 0:9.2f} ms/item", file=sys.stderr)
+        return result
+
+
+def benchmark_batch(pipeline: ResumePipeline, timer: StageTimer, files: List[str], job_description: str, jd_skills: List[str]):
+    n = len(files)
+    # The pipeline's own extractor, so its size/page/time limits apply as they do when ranking
+    extractor = pipeline.extractor
+    section_extractor = pipeline.section_extractor
+
+    texts = timer.run("extraction", n, lambda: [extractor.extract_text_from_file(f) for f in files])
+    timer.run("sectioning", n, lambda: [section_extractor.extract_sections(t) for t in texts])
+    ingested = timer.run("ingest", n, lambda: pipeline.ingestor.ingest(files))
+
+    sections = [r.sections for r in ingested if r.ok]
+    names = [os.path.basename(r.file) for r in ingested if r.ok]
+    features = timer.run("features", n, lambda: [pipeline.compute_resume_features(s) for s in sections])
+
+    bert_texts = [f.pop("bert_text") for f in features]
+    embeddings = timer.run("bert_encode", n, lambda: pipeline.bert_matcher.encode_resumes(bert_texts, cleaned=True))
+    for feature, embedding in zip(features, embeddings):
+        feature["bert_embedding"] = embedding
+
+    index = ResumeIndex()
+    timer.run("index_build", n, lambda: index.add(names, features))
+
+    timer.run("rank_tfidf", n, lambda: pipeline.rank_resumes_tfidf(index, job_description))
+    timer.run("rank_bert", n, lambda: pipeline.rank_resumes_bert(index, job_description))
+    timer.run("rank_keyword", n, lambda: pipeline.rank_resumes_keyword(index, job_description, jd_skills))
+    timer.run("rank_hybrid", n, lambda: pipeline.rank_resumes_hybrid(index, job_description, jd_skills))
+    if n > TWO_STAGE_TOP_N:
+        timer.run("ann_build", n, lambda: index.ann)
+        timer.run("rank_hybrid_two_stage", n, lambda: pipeline.rank_resumes_hybrid(
+            index, job_description, jd_skills, retrieve_top_n=TWO_STAGE_TOP_N
+        ))
+
+
+def compare_to_baseline(
+    results: List[Dict[str, Any]], baseline_path: str, max_regression: float, min_regression_seconds: float = 0.0
+) -> List[str]:
+    """
+    :param min_regression_seconds: slowdowns smaller than this are timer noise and never flagged
+    :return: descriptions of every (stage, batch size) more than max_regression slower than the baseline
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["stage"], r["batch_size"]): r["seconds"] for r in json.load(f)["results"]}
+
+    regressions = []
+    for row in results:
+        before = baseline.get((row["stage"], row["batch_size"]))
+        if (
+            before
+            and row["seconds"] > before * (1 + max_regression)
+            and row["seconds"] - before > min_regression_seconds
+        ):
+            regressions.append(
+                f"{row['stage']} n={row['batch_size']}: {row['seconds']:.3f}s vs baseline {before:.3f}s"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ResumePipeline stages on synthetic resumes")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated batch sizes")
+    parser.add_argument("--words", type=int, default=400, help="approximate words per resume")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated formats: pdf,docx,txt")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", default=None, help="where resumes are generated (reused if present)")
+    parser.add_argument("--ingest-workers", type=int, default=None, help="extraction processes (0 = in-process)")
+    parser.add_argument("--trace-memory", action="store_true", help="record per-stage peak allocations")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="tolerated slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument(
+        "--min-regression-seconds", type=float, default=0.05,
+        help="slowdowns smaller than this many seconds are never reported"
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    corpus_dir = args.corpus_dir or os.path.join(
+        tempfile.gettempdir(), f"smarthire_bench_w{args.words}_s{args.seed}_{'-'.join(formats)}"
+    )
+
+    generator = SyntheticResumeGenerator(words=args.words, seed=args.seed)
+    job_description, jd_skills = generator.job_description()
+    all_files = generator.write(corpus_dir, max(sizes), formats)
+
+    # No feature cache: every run measures the cold path
+    pipeline = ResumePipeline(cache_dir=None, ingest_workers=args.ingest_workers)
+    model_registry.warmup()
+
+    timer = StageTimer(trace_memory=args.trace_memory)
+    try:
+        for size in sizes:
+            benchmark_batch(pipeline, timer, all_files[:size], job_description, jd_skills)
+    finally:
+        pipeline.ingestor.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sizes,
+            "words": args.words,
+            "formats": formats,
+            "seed": args.seed,
+            "ingest_workers": pipeline.ingestor.max_workers,
+            "bert_model": pipeline.bert_matcher.model_key,
+        },
+        "model_load_seconds": dict(model_registry.load_times),
+        "results": timer.results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            timer.results, args.baseline, args.max_regression, args.min_regression_seconds
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import json
+import os
+import random
+import textwrap
+from typing import List, Tuple
+
+import docx
+import fitz
+
+FILLER_WORDS = [
+    "designed", "built", "led", "improved", "migrated", "maintained", "delivered", "automated",
+    "scalable", "reliable", "internal", "customer", "platform", "service", "pipeline", "dashboard",
+    "team", "latency", "throughput", "release", "features", "reporting", "users", "production",
+    "reduced", "increased", "costs", "errors", "weekly", "across", "using", "with", "for", "and",
+]
+
+EDUCATION_LINES = [
+    "Bachelor of Engineering in Computer Science",
+    "Master of Science in Data Science",
+    "Bachelor of Technology in Information Science",
+]
+
+FORMATS = ["pdf", "docx", "txt"]
+
+
+def load_vocabularies(static_dir: str = "static_base") -> Tuple[List[str], List[str]]:
+    """
+    :return: (skills, job titles) flattened from static_base/skills.json and job_titles.json
+    """
+    with open(os.path.join(static_dir, "skills.json"), "r", encoding="utf-8") as f:
+        skills = [skill for group in json.load(f).values() for skill in group]
+    with open(os.path.join(static_dir, "job_titles.json"), "r", encoding="utf-8") as f:
+        titles = [title for group in json.load(f).values() for title in group]
+    return skills, titles
+
+
+class SyntheticResumeGenerator:
+    """
+    Deterministic synthetic resumes and job descriptions built from the static_base
+    vocabularies, with section headers the section extractor recognizes.
+    """
+
+    def __init__(self, static_dir: str = "static_base", words: int = 400, seed: int = 0):
+        """
+        :param words: approximate number of words per resume
+        :param seed: random seed; the same seed always produces the same corpus
+        """
+        self.skills, self.titles = load_vocabularies(static_dir)
+        self.words = words
+        self.seed = seed
+
+    def resume_text(self, i: int) -> str:
+        rng = random.Random(f"{self.seed}:{i}")
+        title = rng.choice(self.titles)
+        skills = rng.sample(self.skills, min(len(self.skills), rng.randint(6, 15)))
+
+        # Roughly half the words go to experience, the rest to projects
+        experience_words = self.words // 2
+        project_words = self.words - experience_words - len(skills)
+
+        lines = [
+            f"Candidate {i}",
+            f"{title.title()} | candidate{i}@example.com",
+            "",
+            "Summary",
+            f"{title.title()} with {rng.randint(1, 15)} years of experience in {', '.join(skills[:3])}.",
+            "",
+            "Skills",
+            ", ".join(skills),
+            "",
+            "Experience",
+            *self._paragraphs(rng, experience_words, skills),
+            "",
+            "Projects",
+            *self._paragraphs(rng, max(project_words, 0), skills),
+            "",
+            "Education",
+            rng.choice(EDUCATION_LINES),
+        ]
+        return "\n".join(lines)
+
+    def job_description(self, i: int = 0) -> Tuple[str, List[str]]:
+        """
+        :return: (job description text, required skills)
+        """
+        rng = random.Random(f"{self.seed}:jd:{i}")
+        title = rng.choice(self.titles)
+        skills = rng.sample(self.skills, min(len(self.skills), 6))
+        text = (
+            f"We are looking for a {title} with strong {skills[0]} and {skills[1]} skills. "
+            f"Experience with {', '.join(skills[2:])} is expected. "
+            + " ".join(rng.choice(FILLER_WORDS) for _ in range(60))
+        )
+        return text, skills
+
+    def _paragraphs(self, rng: random.Random, n_words: int, skills: List[str]) -> List[str]:
+        words = [rng.choice(skills) if rng.random() < 0.1 else rng.choice(FILLER_WORDS) for _ in range(n_words)]
+        return ["- " + " ".join(words[i:i + 20]) for i in range(0, len(words), 20)]
+
+    # FILE WRITERS
+    def write(self, out_dir: str, n: int, formats: List[str] = None) -> List[str]:
+        """
+        Write n resumes to out_dir, cycling through the given formats.
+        :return: file paths in generation order
+        """
+        formats = formats or FORMATS
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for i in range(n):
+            fmt = formats[i % len(formats)]
+            path = os.path.join(out_dir, f"resume_{i:05d}.{fmt}")
+            if not os.path.exists(path):
+                getattr(self, f"write_{fmt}")(path, self.resume_text(i))
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def write_txt(path: str, text: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    @staticmethod
+    def write_docx(path: str, text: str):
+        document = docx.Document()
+        for line in text.split("\n"):
+            document.add_paragraph(line)
+        document.save(path)
+
+    @staticmethod
+    def write_pdf(path: str, text: str, lines_per_page: int = 60):
+        lines = [wrapped for line in text.split("\n") for wrapped in (textwrap.wrap(line, 95) or [""])]
+        doc = fitz.open()
+        try:
+            for start in range(0, len(lines), lines_per_page):
+                page = doc.new_page()
+                for row, line in enumerate(lines[start:start + lines_per_page]):
+                    page.insert_text((40, 40 + row * 12), line, fontsize=9)
+            doc.save(path)
+        finally:
+            doc.close()
@@ -0,0 +1,107 @@
+"""
+Cascade ranking against the full hybrid ranking. The models are replaced by fixed per-resume
+scores and 2-d embeddings, so only the ranking logic of ResumePipeline is exercised.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.bert_matcher import BertRanker
+from app.pipeline import ResumePipeline, normalize_scores
+from app.resume_index import ResumeIndex
+
+JD = "job description"
+JD_SKILLS = ["python"]
+
+
+class FakeBert:
+    model = SimpleNamespace(get_sentence_embedding_dimension=lambda: 2)
+
+    def encode_job_description(self, job_desc):
+        return np.array([1.0, 0.0], dtype=np.float32)
+
+    def score_embeddings(self, job_desc, resume_embeddings, jd_embedding=None):
+        if jd_embedding is None:
+            jd_embedding = self.encode_job_description(job_desc)
+        return BertRanker.score_embeddings_many(np.reshape(jd_embedding, (1, -1)), resume_embeddings)[0]
+
+
+def make_pool(n, seed):
+    rng = np.random.default_rng(seed)
+    names = [f"r{i}.txt" for i in range(n)]
+    angles = rng.uniform(0, np.pi / 2, n)
+    embeddings = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+    tfidf = rng.uniform(0, 1, n)
+    keyword = rng.uniform(0, 1, n)
+    # The resume closest to the JD by BERT has the worst cheap scores, so the cascade skips it
+    best = int(np.argmin(tfidf + keyword))
+    embeddings[best] = [1.0, 0.0]
+    return names, embeddings, tfidf, keyword
+
+
+def make_pipeline(names, embeddings, tfidf, keyword, encoded_names):
+    position = {name: i for i, name in enumerate(names)}
+
+    def features(name, with_embedding):
+        f = {"text": name, "tfidf_text": name, "keywords": [], "skills": [], "spacy_vector": np.zeros(2)}
+        if with_embedding:
+            f["bert_embedding"] = embeddings[position[name]]
+        else:
+            f["bert_text"] = name
+        return f
+
+    def component(values):
+        def score(candidates, job_description, *args, rows=None, **kwargs):
+            scores = normalize_scores(values[[position[name] for name in candidates.names]])
+            return scores if rows is None else scores[rows]
+        return score
+
+    def encode_resume_features(pending, progress=None):
+        for f in pending:
+            name = f.pop("bert_text")
+            f["bert_embedding"] = embeddings[position[name]]
+            encoded_names.append(name)
+        return len(pending)
+
+    pipeline = ResumePipeline.__new__(ResumePipeline)
+    pipeline.extractor = SimpleNamespace(file_name=lambda file: file)
+    pipeline.bert_matcher = FakeBert()
+    pipeline.get_resume_features = lambda files, progress=None, encode_bert=True: (
+        [features(name, False) for name in files], {}
+    )
+    pipeline.encode_resume_features = encode_resume_features
+    pipeline.score_resumes_tfidf = component(tfidf)
+    pipeline.score_resumes_keyword = component(keyword)
+
+    full_index = ResumeIndex()
+    full_index.add(names, [features(name, True) for name in names])
+    return pipeline, full_index
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_full_top_k_is_always_encoded(seed):
+    names, embeddings, tfidf, keyword = make_pool(60, seed)
+    encoded = []
+    pipeline, full_index = make_pipeline(names, embeddings, tfidf, keyword, encoded)
+
+    top_k, offset = 5, 2
+    ranked, _, stats = pipeline.rank_resumes_cascade(names, JD, JD_SKILLS, top_k, batch_size=4, offset=offset)
+    full = pipeline.rank_resumes_hybrid(full_index, JD, JD_SKILLS, top_k=offset + top_k)
+
+    assert stats["skipped"] > 0
+    assert len(ranked) == top_k
+    assert {name for name, _ in full} <= set(encoded)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_hybrid_when_nothing_is_skipped(seed):
+    names, embeddings, tfidf, keyword = make_pool(30, seed)
+    pipeline, full_index = make_pipeline(names, embeddings, tfidf, keyword, [])
+
+    ranked, _, stats = pipeline.rank_resumes_cascade(names, JD, JD_SKILLS, len(names), batch_size=4)
+    full = pipeline.rank_resumes_hybrid(full_index, JD, JD_SKILLS)
+
+    assert stats["skipped"] == 0
+    assert [name for name, _ in ranked] == [name for name, _ in full]
+    assert np.allclose([score for _, score in ranked], [score for _, score in full])
@@ -0,0 +1,43 @@
+"""
+Finished jobs must not keep their inputs alive: JobQueue remembers up to max_jobs of them.
+"""
+import gc
+import weakref
+
+from app.jobs import InlineJobQueue
+
+
+class Upload:
+    def __init__(self, content: bytes):
+        self.content = content
+
+
+def submit_with_upload(queue, fail=False):
+    upload = Upload(b"x" * 1024)
+
+    def rank(job):
+        if fail:
+            raise ValueError("bad upload")
+        return len(upload.content)
+
+    job = queue.submit(rank)
+    return job, weakref.ref(upload)
+
+
+def test_completed_job_releases_its_inputs():
+    job, upload = submit_with_upload(InlineJobQueue())
+    gc.collect()
+
+    assert job.status == "done"
+    assert job.result == 1024
+    assert job.func is None
+    assert upload() is None
+
+
+def test_failed_job_releases_its_inputs():
+    job, upload = submit_with_upload(InlineJobQueue(), fail=True)
+    gc.collect()
+
+    assert job.status == "failed"
+    assert job.error == "ValueError: bad upload"
+    assert upload() is None
@@ -0,0 +1,39 @@
+"""
+Single-letter and everyday-word skills (C, R, Go) only count when a resume uses them as skills.
+"""
+import pytest
+
+from app.skill_matcher import SkillMatcher
+
+UNRELATED = "Led R&D projects; we go live in Q3, see appendix c."
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return SkillMatcher()
+
+
+def test_ambiguous_skills_without_context_are_ignored(matcher):
+    assert matcher.find_skills(UNRELATED) == set()
+    assert matcher.find_skills("Planned the go-live of the C-suite dashboard") == set()
+    assert matcher.find_skills("Built APIs in Python. Go live was in May") == {"python"}
+
+
+@pytest.mark.parametrize("text, skills", [
+    ("C/C++", {"c", "c++"}),
+    ("Python, R, SQL", {"python", "r", "sql"}),
+    ("Languages:\nPython\nR", {"python", "r"}),
+    ("Go developer", {"go"}),
+    ("R language", {"r"}),
+    ("golang", {"golang"}),
+])
+def test_ambiguous_skills_with_context_are_found(matcher, text, skills):
+    assert matcher.find_skills(text) == skills
+
+
+def test_jd_asking_for_ambiguous_skills_does_not_match_unrelated_resume(matcher):
+    jd_skills = matcher.compile_jd_skills(["C", "R", "Go"])
+
+    assert matcher.skill_overlap(matcher.find_skills(UNRELATED), UNRELATED, jd_skills) == 0.0
+    resume = "Python, R, SQL and C/C++"
+    assert matcher.skill_overlap(matcher.find_skills(resume), resume, jd_skills) == pytest.approx(2 / 3)